@@ -11,6 +11,7 @@ t = [list(map(int, lines[i].split())) for i in range(n + 1, 2*n + 2)]
 
 import random
 import time
+from validator import self_check
 
 def init_feasible_solution(n, e, l, d, t):
     path = [0]
@@ -37,7 +38,7 @@ def calculate_cost(path, t):
     cost = 0
     for i in range(len(path) - 1):
         cost += t[path[i]][path[i + 1]]
-    return cost
+    return cost + t[path[-1]][0]  # Return to the depot, as everywhere else
 def is_feasible(path, e, l, d, t):
     cur_time = 0
     for i in range(len(path) - 1):
@@ -101,6 +102,7 @@ complete_candidate = init_feasible_solution(n, e, l, d, t)
 print(is_feasible(complete_candidate, e, l, d, t))
 best_path = local_search(complete_candidate, t, e, l, d)
 best_cost = calculate_cost(best_path, t)
+self_check((n, list(zip(e[1:], l[1:], d[1:])), t), best_path[1:], best_cost, "LS_AI")
 print(best_cost)
 print(n)
 print(" ".join(map(str, best_path[1:])))
@@ -0,0 +1,502 @@
+import math
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from local_search import TSPTimeWindows, read_instance
+from bounds import format_gap, lower_bound
+from validator import self_check
+
+
+class OperatorStats:
+    """
+    Adaptive weight and usage counters for a single destroy/repair operator
+    """
+    def __init__(self, name: str, weight: float = 1.0):
+        self.name = name
+        self.weight = weight
+        self.calls = 0
+        self.new_best = 0
+        self.improved = 0
+        self.accepted = 0
+        self.failed = 0
+        self.total_time = 0.0
+
+        # Score collected over the current segment
+        self.segment_score = 0.0
+        self.segment_calls = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "weight": self.weight,
+            "calls": self.calls,
+            "new_best": self.new_best,
+            "improved": self.improved,
+            "accepted": self.accepted,
+            "failed": self.failed,
+            "total_time": self.total_time,
+        }
+
+
+class ALNS:
+    """
+    Adaptive Large Neighbourhood Search on top of TSPTimeWindows
+
+    Each iteration removes a few customers with a destroy operator and
+    reinserts them with a repair operator. Operators are chosen by roulette
+    wheel and their weights adapt from how often they produce new best,
+    improving or accepted solutions.
+    """
+    def __init__(self, tsp: TSPTimeWindows, acceptance: str = "rrt",
+                 scores: Tuple[float, float, float] = (33.0, 9.0, 13.0),
+                 reaction_factor: float = 0.1, segment_length: int = 100,
+                 min_destroy: int = 2, max_destroy: int = 30, destroy_fraction: float = 0.15,
+                 rrt_deviation: float = 0.02, start_temperature: float = 100.0,
+                 cooling_rate: float = 0.9995, seed: Optional[int] = None):
+        if acceptance not in ("rrt", "sa"):
+            raise ValueError(f"Unknown acceptance criterion: {acceptance}")
+
+        self.tsp = tsp
+        self.travel = tsp.travel_matrix
+        self.windows = tsp.time_windows
+        self.max_travel = max(max(row) for row in self.travel) or 1  # Shaw relatedness scale
+        self.acceptance = acceptance
+        self.scores = scores  # (new best, improved, accepted)
+        self.reaction_factor = reaction_factor
+        self.segment_length = segment_length
+        self.min_destroy = min_destroy
+        self.max_destroy = max_destroy
+        self.destroy_fraction = destroy_fraction
+        self.rrt_deviation = rrt_deviation
+        self.start_temperature = start_temperature
+        self.cooling_rate = cooling_rate
+        self.random = random.Random(seed)
+
+        self.destroy_operators: Dict[str, Callable[[List[int], int], Tuple[List[int], List[int]]]] = {
+            "random": self.random_removal,
+            "worst": self.worst_removal,
+            "shaw": self.shaw_removal,
+            "time_slice": self.time_slice_removal,
+        }
+        self.repair_operators: Dict[str, Callable[[List[int], List[int]], Optional[List[int]]]] = {
+            "greedy": self.greedy_insertion,
+            "regret2": lambda route, removed: self.regret_insertion(route, removed, 2),
+            "regret3": lambda route, removed: self.regret_insertion(route, removed, 3),
+        }
+        self.destroy_stats = {name: OperatorStats(name) for name in self.destroy_operators}
+        self.repair_stats = {name: OperatorStats(name) for name in self.repair_operators}
+
+        self.iterations = 0
+
+    # ------------------------------------------------------------------
+    # Schedule helpers
+    # ------------------------------------------------------------------
+
+    def _schedule(self, route: List[int]) -> Tuple[List[int], List[float]]:
+        """
+        Forward departure times and backward latest service starts for route
+        departure[k] is the time we leave position k (position 0 is the depot),
+        latest[k] is the latest service start at position k that keeps the
+        rest of the route feasible (latest[len(route) + 1] is the return leg).
+        """
+        departure = [self.tsp.start_time]
+        location = 0
+        for customer in route:
+            earliest, _, service_duration = self.windows[customer - 1]
+            arrival = departure[-1] + self.travel[location][customer]
+            departure.append(max(arrival, earliest) + service_duration)
+            location = customer
+
+        latest = [float('inf')] * (len(route) + 2)
+        for k in range(len(route), 0, -1):
+            customer = route[k - 1]
+            _, latest_start, service_duration = self.windows[customer - 1]
+            following = route[k] if k < len(route) else 0
+            latest[k] = min(latest_start, latest[k + 1] - self.travel[customer][following] - service_duration)
+
+        return departure, latest
+
+    def _best_insertions(self, route: List[int], customer: int, departure: List[int],
+                         latest: List[float], keep: int) -> List[Tuple[int, int]]:
+        """
+        Cheapest feasible insertion positions of customer as (delta, position)
+        Feasibility is decided in O(1) per position from the route schedule.
+        """
+        earliest, latest_start, service_duration = self.windows[customer - 1]
+        options = []
+        previous = 0
+        for position in range(len(route) + 1):
+            following = route[position] if position < len(route) else 0
+            arrival = departure[position] + self.travel[previous][customer]
+            if arrival <= latest_start:
+                leave = max(arrival, earliest) + service_duration
+                if position == len(route) or leave + self.travel[customer][following] <= latest[position + 1]:
+                    delta = (self.travel[previous][customer] + self.travel[customer][following]
+                             - self.travel[previous][following])
+                    options.append((delta, position))
+            previous = following
+
+        options.sort()
+        return options[:keep]
+
+    def _removal_count(self, route: List[int]) -> int:
+        upper = min(self.max_destroy, max(self.min_destroy, int(len(route) * self.destroy_fraction)))
+        upper = min(upper, len(route))
+        lower = min(self.min_destroy, upper)
+        return self.random.randint(lower, upper) if upper > 0 else 0
+
+    # ------------------------------------------------------------------
+    # Destroy operators
+    # ------------------------------------------------------------------
+
+    def random_removal(self, route: List[int], count: int) -> Tuple[List[int], List[int]]:
+        """
+        Remove count customers chosen uniformly at random
+        """
+        removed = self.random.sample(route, count)
+        removed_set = set(removed)
+        return [c for c in route if c not in removed_set], removed
+
+    def worst_removal(self, route: List[int], count: int, randomness: float = 3.0) -> Tuple[List[int], List[int]]:
+        """
+        Remove customers with the largest detour cost, with randomised ranking
+        """
+        current = route[:]
+        removed = []
+        for _ in range(count):
+            savings = []
+            for k, customer in enumerate(current):
+                previous = current[k - 1] if k > 0 else 0
+                following = current[k + 1] if k + 1 < len(current) else 0
+                saving = (self.travel[previous][customer] + self.travel[customer][following]
+                          - self.travel[previous][following])
+                savings.append((saving, k))
+            savings.sort(reverse=True)
+            pick = int(len(savings) * self.random.random() ** randomness)
+            removed.append(current.pop(savings[pick][1]))
+        return current, removed
+
+    def shaw_removal(self, route: List[int], count: int, distance_weight: float = 1.0,
+                     time_weight: float = 1.0, randomness: float = 6.0) -> Tuple[List[int], List[int]]:
+        """
+        Related (Shaw) removal by travel time and service start time
+        """
+        departure, _ = self._schedule(route)
+        start = {}
+        for k, customer in enumerate(route):
+            start[customer] = departure[k + 1] - self.windows[customer - 1][2]
+
+        max_travel = self.max_travel
+        horizon = (max(start.values()) - min(start.values())) or 1
+
+        def relatedness(a: int, b: int) -> float:
+            return (distance_weight * (self.travel[a][b] + self.travel[b][a]) / (2 * max_travel)
+                    + time_weight * abs(start[a] - start[b]) / horizon)
+
+        remaining = route[:]
+        removed = [remaining.pop(self.random.randrange(len(remaining)))]
+        while len(removed) < count:
+            reference = self.random.choice(removed)
+            remaining.sort(key=lambda c: relatedness(reference, c))
+            pick = int(len(remaining) * self.random.random() ** randomness)
+            removed.append(remaining.pop(pick))
+
+        removed_set = set(removed)
+        return [c for c in route if c not in removed_set], removed
+
+    def time_slice_removal(self, route: List[int], count: int) -> Tuple[List[int], List[int]]:
+        """
+        Remove the customers whose time windows are closest to a random instant
+        """
+        anchor = self.random.choice(route)
+        earliest, latest, _ = self.windows[anchor - 1]
+        instant = self.random.uniform(earliest, latest)
+
+        def distance(customer: int) -> float:
+            e, l, _ = self.windows[customer - 1]
+            if e <= instant <= l:
+                return 0.0
+            return min(abs(e - instant), abs(l - instant))
+
+        removed = sorted(route, key=distance)[:count]
+        removed_set = set(removed)
+        return [c for c in route if c not in removed_set], removed
+
+    # ------------------------------------------------------------------
+    # Repair operators
+    # ------------------------------------------------------------------
+
+    def repair_route(self, route: List[int], regret_limit: int = 20, lookback: int = 5,
+                     rng: Optional[random.Random] = None) -> Optional[List[int]]:
+        """
+        Make an infeasible route feasible: a customer served too late is moved
+        up to lookback positions earlier, or else retried after each later
+        customer is placed; customers that still do not fit are reinserted
+        with regret-2 insertion (or, past regret_limit of them, one by one in
+        deadline order to stay near-linear)
+        rng replaces self.random for tie breaking, e.g. for per-job seeding.
+        Returns None if some customer cannot be reinserted.
+        """
+        kept = []
+        departure = [self.tsp.start_time]  # departure[k] is the time we leave position k
+
+        def place(customer: int) -> bool:
+            for position in range(len(kept), max(-1, len(kept) - lookback - 1), -1):
+                # Simulate customer followed by kept[position:]
+                current_time = departure[position]
+                location = kept[position - 1] if position > 0 else 0
+                shifted = []
+                for node in [customer] + kept[position:]:
+                    earliest, latest, service_duration = self.windows[node - 1]
+                    arrival = current_time + self.travel[location][node]
+                    if arrival > latest:
+                        break
+                    current_time = max(arrival, earliest) + service_duration
+                    shifted.append(current_time)
+                    location = node
+                else:
+                    kept.insert(position, customer)
+                    departure[position + 1:] = shifted
+                    return True
+            return False
+
+        pending = []
+        for customer in route:
+            if not place(customer):
+                pending.append(customer)
+                continue
+            retry = True
+            while retry and pending:
+                retry = False
+                for waiting in pending:
+                    if place(waiting):
+                        pending.remove(waiting)
+                        retry = True
+                        break
+        removed = pending
+
+        if not removed:
+            return kept
+        if len(removed) <= regret_limit:
+            return self.regret_insertion(kept, removed, 2, rng)
+
+        return self.cheapest_insertion(kept, sorted(removed, key=lambda c: self.windows[c - 1][1]))
+
+    def cheapest_insertion(self, route: List[int], customers: List[int]) -> Optional[List[int]]:
+        """
+        Insert customers one by one, in the given order, at their cheapest
+        feasible position. Returns None if some customer fits nowhere.
+        """
+        route = route[:]
+        for customer in customers:
+            departure, latest = self._schedule(route)
+            options = self._best_insertions(route, customer, departure, latest, 1)
+            if not options:
+                return None
+            route.insert(options[0][1], customer)
+        return route
+
+    def greedy_insertion(self, route: List[int], removed: List[int]) -> Optional[List[int]]:
+        """
+        Repeatedly insert the customer with the cheapest feasible insertion
+        Returns None if some customer cannot be inserted anywhere.
+        """
+        return self.regret_insertion(route, removed, 1)
+
+    def regret_insertion(self, route: List[int], removed: List[int], k: int,
+                         rng: Optional[random.Random] = None) -> Optional[List[int]]:
+        """
+        Regret-k insertion: insert first the customer that loses most by
+        not getting its best position (k = 1 is plain greedy insertion)
+        """
+        route = route[:]
+        pending = removed[:]
+        (rng or self.random).shuffle(pending)  # Random tie breaking
+
+        while pending:
+            departure, latest = self._schedule(route)
+            best_customer = None
+            best_key = None
+            best_position = 0
+
+            for customer in pending:
+                options = self._best_insertions(route, customer, departure, latest, k)
+                if not options:
+                    return None
+
+                if k == 1:
+                    key = -options[0][0]
+                else:
+                    # Missing alternatives count as very expensive
+                    regret = 0
+                    for m in range(1, k):
+                        alternative = options[m][0] if m < len(options) else 10 ** 9
+                        regret += alternative - options[0][0]
+                    key = regret - options[0][0] * 1e-6
+
+                if best_key is None or key > best_key:
+                    best_key = key
+                    best_customer = customer
+                    best_position = options[0][1]
+
+            route.insert(best_position, best_customer)
+            pending.remove(best_customer)
+
+        return route
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+
+    def _select(self, stats: Dict[str, OperatorStats]) -> str:
+        names = list(stats)
+        return self.random.choices(names, weights=[stats[name].weight for name in names])[0]
+
+    def _update_weights(self, stats: Dict[str, OperatorStats]):
+        for operator in stats.values():
+            if operator.segment_calls:
+                operator.weight = ((1 - self.reaction_factor) * operator.weight
+                                   + self.reaction_factor * operator.segment_score / operator.segment_calls)
+                # Never let an operator die out completely
+                operator.weight = max(operator.weight, 0.05)
+            operator.segment_score = 0.0
+            operator.segment_calls = 0
+
+    def _accept(self, new_cost: int, current_cost: int, best_cost: int, temperature: float) -> bool:
+        if new_cost <= current_cost:
+            return True
+        if self.acceptance == "rrt":
+            return new_cost <= best_cost * (1 + self.rrt_deviation)
+        return self.random.random() < math.exp(-(new_cost - current_cost) / max(temperature, 1e-9))
+
+    def solve(self, initial_route: Optional[List[int]] = None, time_limit: float = 30.0,
+              max_iterations: Optional[int] = None, polish_best: bool = True,
+              on_improvement: Optional[Callable[[List[int], int], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[int], int]:
+        """
+        Run ALNS from initial_route (or TSPTimeWindows.get_initial_solution)
+        on_improvement(route, cost) is called for every new best route,
+        should_stop() is polled once per iteration to allow cancellation
+        Returns (best_route, best_cost)
+        """
+        start_time = time.time()
+
+        current_route = initial_route[:] if initial_route is not None else self.tsp.get_initial_solution()
+        current_cost, feasible = self.tsp.fast_feasibility_check(current_route)
+
+        if not feasible:
+            print("Warning: No feasible initial solution found", file=sys.stderr)
+            return current_route, current_cost
+
+        best_route = current_route[:]
+        best_cost = current_cost
+        temperature = self.start_temperature
+        seen = {hash(tuple(current_route))}  # Hashes only, full routes would pile up on long runs
+        if on_improvement:
+            on_improvement(best_route[:], best_cost)
+
+        while time.time() - start_time < time_limit:
+            if max_iterations is not None and self.iterations >= max_iterations:
+                break
+            if should_stop and should_stop():
+                break
+            self.iterations += 1
+
+            destroy_name = self._select(self.destroy_stats)
+            repair_name = self._select(self.repair_stats)
+            destroy = self.destroy_stats[destroy_name]
+            repair = self.repair_stats[repair_name]
+            destroy.calls += 1
+            repair.calls += 1
+            destroy.segment_calls += 1
+            repair.segment_calls += 1
+
+            count = self._removal_count(current_route)
+            tick = time.time()
+            partial, removed = self.destroy_operators[destroy_name](current_route, count)
+            tock = time.time()
+            candidate = self.repair_operators[repair_name](partial, removed)
+            destroy.total_time += tock - tick
+            repair.total_time += time.time() - tock
+
+            score = 0.0
+            if candidate is None:
+                destroy.failed += 1
+                repair.failed += 1
+            else:
+                new_cost, new_feasible = self.tsp.fast_feasibility_check(candidate)
+                is_new = hash(tuple(candidate)) not in seen
+
+                if new_feasible and self._accept(new_cost, current_cost, best_cost, temperature):
+                    if new_cost < best_cost:
+                        if polish_best:
+                            candidate, new_cost = self.tsp.fast_2opt(candidate, max_attempts=50)
+                        best_route = candidate[:]
+                        best_cost = new_cost
+                        score = self.scores[0]
+                        destroy.new_best += 1
+                        repair.new_best += 1
+                        if on_improvement:
+                            on_improvement(best_route[:], best_cost)
+                    elif new_cost < current_cost:
+                        if is_new:
+                            score = self.scores[1]
+                        destroy.improved += 1
+                        repair.improved += 1
+                    elif is_new:
+                        score = self.scores[2]
+
+                    destroy.accepted += 1
+                    repair.accepted += 1
+                    current_route = candidate
+                    current_cost = new_cost
+                    seen.add(hash(tuple(candidate)))
+
+            destroy.segment_score += score
+            repair.segment_score += score
+
+            if self.iterations % self.segment_length == 0:
+                self._update_weights(self.destroy_stats)
+                self._update_weights(self.repair_stats)
+
+            temperature *= self.cooling_rate
+
+        self_check(self.tsp, best_route, best_cost, "ALNS")
+        return best_route, best_cost
+
+    def statistics(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Per-operator statistics, suitable for tuning weights and scores
+        """
+        return {
+            "destroy": {name: stats.as_dict() for name, stats in self.destroy_stats.items()},
+            "repair": {name: stats.as_dict() for name, stats in self.repair_stats.items()},
+        }
+
+    def print_statistics(self, file=sys.stderr):
+        print(f"ALNS iterations: {self.iterations}", file=file)
+        for kind, table in self.statistics().items():
+            for name, values in table.items():
+                print(f"  {kind:8s} {name:12s} weight={values['weight']:.2f} calls={values['calls']} "
+                      f"best={values['new_best']} improved={values['improved']} "
+                      f"accepted={values['accepted']} failed={values['failed']} "
+                      f"time={values['total_time']:.2f}s", file=file)
+
+
+def solve_tsp_time_windows_alns():
+    """Main function to solve TSP with Time Windows using ALNS"""
+    n, time_windows, travel_matrix = read_instance()
+
+    tsp = TSPTimeWindows(n, time_windows, travel_matrix)
+    alns = ALNS(tsp)
+    best_route, best_cost = alns.solve()
+    alns.print_statistics()
+
+    print(n)
+    print(*best_route)
+    print(best_cost)
+    print(format_gap(best_cost, lower_bound(tsp, upper_bound=best_cost)), file=sys.stderr)
+
+if __name__ == "__main__":
+    solve_tsp_time_windows_alns()
@@ -0,0 +1,212 @@
+import asyncio
+import atexit
+import contextlib
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+from alns import ALNS
+from bounds import GapMonitor, lower_bound
+from local_search import TSPTimeWindows
+
+Instance = Tuple[int, List[Tuple[int, int, int]], List[List[int]]]
+
+
+class SolverBusy(RuntimeError):
+    """Raised when the pool is saturated and the waiting queue is full"""
+
+
+def _as_instance(instance: Union[Instance, TSPTimeWindows], objective: str,
+                 weights: Optional[dict]) -> Tuple[Instance, int, str, Optional[dict]]:
+    """
+    Split instance into picklable parts: (instance, start_time, objective, weights)
+    A TSPTimeWindows brings its own start time and objective.
+    """
+    if isinstance(instance, TSPTimeWindows):
+        weights = dict(zip(("travel", "completion", "waiting"), instance.objective_weights))
+        return ((instance.n, instance.time_windows, instance.travel_matrix), instance.start_time,
+                instance.objective, weights)
+    return instance, 0, objective, weights
+
+
+def _solve_worker(instance: Instance, start_time: int, time_limit: float, method: str, target_gap: Optional[float],
+                  objective: str, weights: Optional[dict], incumbents, stop) -> Tuple[List[int], int]:
+    """
+    Runs inside a pool process: solve one instance and push every new best
+    route to incumbents as (route, cost, elapsed) until done, stop is set or
+    the gap to the lower bound reaches target_gap
+    """
+    start = time.time()
+    n, time_windows, travel_matrix = instance
+    tsp = TSPTimeWindows(n, time_windows, travel_matrix, start_time=start_time, objective=objective, weights=weights)
+
+    def on_improvement(route: List[int], cost: int):
+        incumbents.put((route, cost, time.time() - start))
+
+    should_stop = stop.is_set
+    if target_gap is not None:
+        monitor = GapMonitor(lower_bound(tsp, time_limit=time_limit * 0.1), target_gap, on_improvement, should_stop)
+        on_improvement, should_stop = monitor.on_improvement, monitor.should_stop
+        time_limit = max(0.0, time_limit - (time.time() - start))
+
+    if method == "alns":
+        return ALNS(tsp).solve(time_limit=time_limit, on_improvement=on_improvement, should_stop=should_stop)
+    if method == "local_search":
+        return tsp.local_search_optimized(time_limit, on_improvement=on_improvement, should_stop=should_stop)
+    raise ValueError(f"Unknown method: {method}")
+
+
+class AsyncSolver:
+    """
+    Asyncio front end that runs solves on a managed process pool
+
+    At most max_workers instances are solved at once; further requests wait
+    for a free slot (backpressure) and, if max_waiting are already waiting,
+    fail fast with SolverBusy. A request's deadline caps both waiting and
+    solving time, and cancelling the awaiting task stops the worker at its
+    next iteration. With target_gap set, workers also stop as soon as the
+    best route is within target_gap of a lower bound. objective and weights
+    apply to instances given as tuples; a TSPTimeWindows keeps its own.
+    """
+    def __init__(self, max_workers: Optional[int] = None, max_waiting: Optional[int] = None,
+                 method: str = "alns", target_gap: Optional[float] = None,
+                 objective: str = "travel", weights: Optional[dict] = None, poll_interval: float = 0.05):
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.max_waiting = max_waiting
+        self.method = method
+        self.target_gap = target_gap
+        self.objective = objective
+        self.weights = weights
+        self.poll_interval = poll_interval
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiting = 0
+        self._active = 0
+
+    def _start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._manager = multiprocessing.Manager()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # asyncio primitives belong to one event loop, e.g. one asyncio.run()
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._waiting = self._active = 0
+
+    def shutdown(self):
+        """Shut down the pool and manager, waiting for running workers to finish"""
+        if self._executor is not None:
+            executor, manager = self._executor, self._manager
+            self._executor = self._manager = self._slots = self._loop = None
+            executor.shutdown()
+            manager.shutdown()
+
+    async def close(self):
+        """Shut down the pool without blocking the event loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+
+    async def __aenter__(self) -> "AsyncSolver":
+        self._start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _acquire_slot(self, deadline: Optional[float]):
+        # Counted before the first await, so a burst arriving in one tick is limited too
+        if self.max_waiting is not None and self._waiting + self._active >= self.max_workers + self.max_waiting:
+            raise SolverBusy(f"{self._waiting} requests already waiting for a worker")
+
+        self._waiting += 1
+        try:
+            if deadline is None:
+                await self._slots.acquire()
+            else:
+                timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+                await asyncio.wait_for(self._slots.acquire(), timeout=timeout)
+        finally:
+            self._waiting -= 1
+        self._active += 1
+
+    def _release_slot(self, slots: asyncio.Semaphore):
+        if slots is self._slots:
+            self._active -= 1
+        slots.release()
+
+    async def incumbents(self, instance: Union[Instance, TSPTimeWindows], budget: float,
+                         deadline: Optional[float] = None) -> AsyncIterator[Tuple[List[int], int, float]]:
+        """
+        Solve instance and yield (route, cost, elapsed) for every new best route
+
+        budget is the solve time in seconds, counted once a worker is free;
+        deadline is an optional absolute event-loop time (loop.time()) after
+        which no more results are wanted, waiting time included.
+        Raises asyncio.TimeoutError if no worker frees up before the deadline.
+        """
+        self._start()
+        loop = asyncio.get_running_loop()
+        instance, start_time, objective, weights = _as_instance(instance, self.objective, self.weights)
+
+        await self._acquire_slot(deadline)
+        slots = self._slots
+        time_limit = budget if deadline is None else max(0.0, min(budget, deadline - loop.time()))
+        finish = loop.time() + time_limit
+        try:
+            incumbents = self._manager.Queue()
+            stop = self._manager.Event()
+            future = loop.run_in_executor(self._executor, _solve_worker, instance, start_time, time_limit,
+                                          self.method, self.target_gap, objective, weights, incumbents, stop)
+        except BaseException:
+            self._release_slot(slots)
+            raise
+        # The slot is held until the worker process is really free again
+        future.add_done_callback(lambda _: self._release_slot(slots))
+
+        try:
+            while True:
+                while True:
+                    try:
+                        yield incumbents.get_nowait()
+                    except queue.Empty:
+                        break
+                if future.done():
+                    future.result()  # Propagate worker errors
+                    return
+                if loop.time() > finish + 1.0:
+                    # Worker overran its budget, ask it to stop
+                    stop.set()
+                await asyncio.wait({future}, timeout=self.poll_interval)
+        finally:
+            if not future.done():
+                stop.set()
+
+    async def solve(self, instance: Union[Instance, TSPTimeWindows], budget: float,
+                    deadline: Optional[float] = None) -> Tuple[List[int], int]:
+        """
+        Solve instance within budget seconds and return (best_route, best_cost)
+        """
+        best = None
+        async with contextlib.aclosing(self.incumbents(instance, budget, deadline)) as stream:
+            async for route, cost, _ in stream:
+                best = (route, cost)
+        if best is None:
+            raise RuntimeError("Solver returned no route")
+        return best
+
+
+_default_solver: Optional[AsyncSolver] = None
+
+async def solve(instance: Union[Instance, TSPTimeWindows], budget: float,
+                deadline: Optional[float] = None) -> Tuple[List[int], int]:
+    """Solve instance on a shared module-level AsyncSolver"""
+    global _default_solver
+    if _default_solver is None:
+        _default_solver = AsyncSolver()
+        atexit.register(_default_solver.shutdown)
+    return await _default_solver.solve(instance, budget, deadline)
@@ -1,6 +1,8 @@
 import time
 import sys
 
+from validator import self_check
+
 with open("input.txt", "r") as file:
     lines = file.readlines()
 
@@ -45,6 +47,7 @@ best_path = []
 vis = [False] * (n + 1)
 start_time = time.time()
 backtrack(0, 0, vis, 0, [], best_ans, best_path, start_time)
+self_check((n, client[1:], t), best_path, best_ans[0], "backtrack")
 print(best_ans[0])
 print(n)
 print(" ".join(map(str, best_path)))
\ No newline at end of file
@@ -1,6 +1,8 @@
 import time
 import sys
 
+from validator import self_check
+
 with open("input.txt", "r") as file:
     lines = file.readlines()
 
@@ -34,8 +36,8 @@ def backtrack(i, f, vis, cur_time, path, best_ans, best_path, start_time):
         print("Time limit exceeded")
         sys.exit(0)
     if i == n:
-        if best_ans[0] > f:
-            best_ans[0] = f
+        if best_ans[0] > f + t[path[-1]][0]:
+            best_ans[0] = f + t[path[-1]][0]
             best_path[:] = path[:]
         return
     
@@ -59,6 +61,7 @@ best_path = []
 vis = [False] * (n + 1)
 start_time = time.time()
 backtrack(0, 0, vis, 0, [], best_ans, best_path, start_time)
+self_check((n, client[1:], t), best_path, best_ans[0], "backtrack2")
 # print(best_ans[0])
 print(n)
 print(" ".join(map(str, best_path)))
\ No newline at end of file
@@ -0,0 +1,360 @@
+import math
+import time
+from typing import Callable, List, Optional, Tuple
+
+from local_search import TSPTimeWindows
+
+INF = float('inf')
+
+
+def shortest_from_depot(tsp: TSPTimeWindows) -> List[float]:
+    """
+    Shortest travel time from the depot to every node (dense Dijkstra, O(n^2))
+    Differs from t[0][i] when the matrix breaks the triangle inequality.
+    """
+    t = tsp.travel_matrix
+    distance = list(t[0])
+    distance[0] = 0
+    remaining = set(range(1, tsp.n + 1))
+    while remaining:
+        node = min(remaining, key=distance.__getitem__)
+        remaining.remove(node)
+        base = distance[node]
+        row = t[node]
+        if base + min(row[:node] + row[node + 1:], default=INF) >= max(distance):
+            continue  # Going through node cannot shorten anything
+        distance = [current if current <= base + step else base + step for current, step in zip(distance, row)]
+    return distance
+
+
+def prune_arcs(tsp: TSPTimeWindows) -> List[List[bool]]:
+    """
+    allowed[i][j] is False when no feasible route can travel i -> j directly,
+    because even leaving i as early as possible we reach j after its deadline
+    """
+    n = tsp.n
+    t = tsp.travel_matrix
+
+    # Earliest possible departure from every node; a route may reach i
+    # through other customers faster than t[0][i] on non-metric matrices
+    distance = shortest_from_depot(tsp)
+    departure = [tsp.start_time] * (n + 1)
+    for i in range(1, n + 1):
+        earliest, _, service_duration = tsp.time_windows[i - 1]
+        departure[i] = max(earliest, tsp.start_time + distance[i]) + service_duration
+
+    latest = [-INF] + [latest for _, latest, _ in tsp.time_windows]
+    allowed = []
+    for i in range(n + 1):
+        leave = departure[i]
+        row = [leave + step <= deadline for step, deadline in zip(t[i], latest)]
+        row[i] = False
+        row[0] = i != 0  # Return to depot is always possible
+        allowed.append(row)
+    return allowed
+
+
+def min_arc_bound(tsp: TSPTimeWindows, allowed: Optional[List[List[bool]]] = None) -> int:
+    """
+    Every node is left once and entered once: sum of cheapest allowed
+    outgoing (or incoming) arcs, whichever is larger
+    """
+    allowed = allowed if allowed is not None else prune_arcs(tsp)
+    outgoing = 0
+    incoming = [INF] * (tsp.n + 1)
+    for row, allowed_row in zip(tsp.travel_matrix, allowed):
+        costs = [step if ok else INF for step, ok in zip(row, allowed_row)]
+        outgoing += min(costs)
+        incoming = [best if best <= step else step for best, step in zip(incoming, costs)]
+    return max(outgoing, sum(incoming))
+
+
+def assignment_bound(tsp: TSPTimeWindows, allowed: Optional[List[List[bool]]] = None) -> int:
+    """
+    Assignment relaxation on the pruned arcs (Hungarian algorithm, O(n^3))
+    """
+    allowed = allowed if allowed is not None else prune_arcs(tsp)
+    t = tsp.travel_matrix
+    size = tsp.n + 1
+
+    # Shortest augmenting path Hungarian method, 1-based internally
+    u = [0.0] * (size + 1)
+    v = [0.0] * (size + 1)
+    match = [0] * (size + 1)  # match[column] = row
+    way = [0] * (size + 1)
+
+    for row in range(1, size + 1):
+        match[0] = row
+        column = 0
+        min_value = [INF] * (size + 1)
+        used = [False] * (size + 1)
+        while True:
+            used[column] = True
+            i = match[column]
+            delta = INF
+            next_column = 0
+            u_i = u[i]
+            row_cost = t[i - 1]
+            row_allowed = allowed[i - 1]
+            for j in range(1, size + 1):
+                if used[j]:
+                    continue
+                cost = row_cost[j - 1] if row_allowed[j - 1] else INF
+                current = cost - u_i - v[j]
+                if current < min_value[j]:
+                    min_value[j] = current
+                    way[j] = column
+                if min_value[j] < delta:
+                    delta = min_value[j]
+                    next_column = j
+            if delta == INF:
+                return INF  # No perfect assignment: instance is infeasible
+            for j in range(size + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_value[j] -= delta
+            column = next_column
+            if match[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    return sum(t[match[j] - 1][j - 1] for j in range(1, size + 1))
+
+
+def one_tree_bound(tsp: TSPTimeWindows, allowed: Optional[List[List[bool]]] = None,
+                   upper_bound: Optional[int] = None, iterations: int = 100,
+                   time_limit: Optional[float] = None) -> int:
+    """
+    Held-Karp 1-tree bound with Lagrangian subgradient optimisation on the
+    symmetric relaxation c[i][j] = min(t[i][j], t[j][i]) over allowed arcs
+    """
+    start = time.time()
+    allowed = allowed if allowed is not None else prune_arcs(tsp)
+    t = tsp.travel_matrix
+    size = tsp.n + 1
+    if size < 3:
+        return min_arc_bound(tsp, allowed)
+
+    def out_of_time() -> bool:
+        return time_limit is not None and time.time() - start > time_limit
+
+    cost = []
+    for i in range(size):
+        if out_of_time():
+            return min_arc_bound(tsp, allowed)
+        column = [row[i] for row in t]
+        allowed_column = [row[i] for row in allowed]
+        cost.append([min(a if a_ok else INF, b if b_ok else INF)
+                     for a, a_ok, b, b_ok in zip(t[i], allowed[i], column, allowed_column)])
+        cost[i][i] = INF
+
+    if upper_bound is None and not out_of_time():
+        initial = tsp.get_initial_solution()
+        if tsp.fast_feasibility_check(initial)[1]:
+            upper_bound = tsp.route_state(initial).total_travel
+
+    pi = [0.0] * size
+    best = -INF
+    step_scale = 2.0
+    stall = 0
+
+    for _ in range(iterations):
+        if out_of_time():
+            break
+
+        # Prim's MST over nodes 1..n with penalised costs
+        degree = [0] * size
+        in_tree = [False] * size
+        key = [INF] * size
+        parent = [0] * size
+        key[1] = 0.0
+        tree_cost = 0.0
+        for _ in range(size - 1):
+            node = -1
+            node_key = INF
+            for j in range(1, size):
+                if not in_tree[j] and key[j] < node_key:
+                    node, node_key = j, key[j]
+            if node == -1:
+                return INF  # Allowed arcs do not connect all customers
+            in_tree[node] = True
+            tree_cost += node_key
+            if node != 1:
+                degree[node] += 1
+                degree[parent[node]] += 1
+            row = cost[node]
+            pi_node = pi[node]
+            for j in range(1, size):
+                if not in_tree[j]:
+                    penalised = row[j] + pi_node + pi[j]
+                    if penalised < key[j]:
+                        key[j] = penalised
+                        parent[j] = node
+
+        # Two cheapest depot edges
+        depot_edges = sorted((cost[0][j] + pi[0] + pi[j], j) for j in range(1, size))
+        for value, j in depot_edges[:2]:
+            tree_cost += value
+            degree[j] += 1
+        degree[0] = 2
+
+        value = tree_cost - 2 * sum(pi)
+        if value > best + 1e-9:
+            best = value
+            stall = 0
+        else:
+            stall += 1
+            if stall >= 10:
+                step_scale /= 2
+                stall = 0
+
+        subgradient = [deg - 2 for deg in degree]
+        norm = sum(g * g for g in subgradient)
+        if norm == 0:
+            break  # The 1-tree is a tour: bound is tight
+        target = upper_bound if upper_bound is not None else value * 1.05
+        step = step_scale * max(target - value, 1e-3) / norm
+        for i in range(size):
+            pi[i] += step * subgradient[i]
+
+    if best == -INF:
+        return min_arc_bound(tsp, allowed)  # No subgradient iteration ran
+    # Travel times are integral, so the bound can be rounded up
+    return math.ceil(best - 1e-6)
+
+
+def lp_bound(tsp: TSPTimeWindows, allowed: Optional[List[List[bool]]] = None,
+             time_limit: float = 10.0) -> int:
+    """
+    LP relaxation of the notebook MIP (degree + time-propagation constraints)
+    on the pruned arcs. Requires ortools.
+    """
+    from ortools.linear_solver import pywraplp
+
+    allowed = allowed if allowed is not None else prune_arcs(tsp)
+    t = tsp.travel_matrix
+    size = tsp.n + 1
+    arcs = [(i, j) for i in range(size) for j in range(size) if allowed[i][j]]
+
+    solver = pywraplp.Solver.CreateSolver('GLOP')
+    solver.set_time_limit(int(time_limit * 1000))
+    x = {(i, j): solver.NumVar(0, 1, f'x[{i},{j}]') for i, j in arcs}
+    start = [solver.NumVar(tsp.start_time, tsp.start_time, 's[0]')]
+    for i in range(1, size):
+        earliest, latest, _ = tsp.time_windows[i - 1]
+        start.append(solver.NumVar(earliest, latest, f's[{i}]'))
+
+    for k in range(size):
+        solver.Add(sum(x[i, j] for i, j in arcs if i == k) == 1)
+        solver.Add(sum(x[i, j] for i, j in arcs if j == k) == 1)
+
+    for i, j in arcs:
+        if j == 0:
+            continue
+        latest_i = tsp.time_windows[i - 1][1] if i else tsp.start_time
+        service_duration = tsp.time_windows[i - 1][2] if i else 0
+        big_m = max(0, latest_i + service_duration + t[i][j] - tsp.time_windows[j - 1][0])
+        solver.Add(start[j] >= start[i] + service_duration + t[i][j] - big_m * (1 - x[i, j]))
+
+    solver.Minimize(sum(t[i][j] * x[i, j] for i, j in arcs))
+    if solver.Solve() not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        return INF
+    return math.ceil(solver.Objective().Value() - 1e-6)
+
+
+def lower_bound(tsp: TSPTimeWindows, time_limit: float = 5.0, upper_bound: Optional[int] = None) -> int:
+    """
+    Best of the cheap bounds within roughly time_limit seconds, expressed in
+    tsp's objective (the other bounds here are on travel time only)
+    """
+    start = time.time()
+    allowed = prune_arcs(tsp)
+    best = min_arc_bound(tsp, allowed)
+
+    if tsp.n <= 300:
+        best = max(best, assignment_bound(tsp, allowed))
+
+    remaining = time_limit - (time.time() - start)
+    if remaining > 0:
+        if not tsp.travel_only:
+            upper_bound = None  # Not a travel time, only steers the subgradient step
+        best = max(best, one_tree_bound(tsp, allowed, upper_bound=upper_bound, time_limit=remaining))
+    return objective_bound(tsp, best)
+
+
+def objective_bound(tsp: TSPTimeWindows, travel_bound: int) -> int:
+    """
+    Turn a travel time bound into a bound on tsp's objective, using
+    completion = start + travel + service + waiting and waiting >= 0
+    """
+    if travel_bound == INF:
+        return INF  # Proven infeasible under every objective (avoids 0 * inf = nan)
+    w_travel, w_completion, _ = tsp.objective_weights
+    service = sum(service_duration for _, _, service_duration in tsp.time_windows)
+    return w_travel * travel_bound + w_completion * (tsp.start_time + travel_bound + service)
+
+
+def optimality_gap(cost: float, bound: float) -> float:
+    """
+    Relative gap (cost - bound) / cost, 0.0 when the route is proven optimal
+    An infinite bound (infeasible instance) proves nothing about cost.
+    """
+    if cost == INF or bound in (INF, -INF) or math.isnan(cost) or math.isnan(bound):
+        return INF
+    if cost <= 0:
+        return 0.0
+    return max(0.0, (cost - bound) / cost)
+
+
+class GapMonitor:
+    """
+    Tracks the gap of a running solver against a lower bound
+
+    Pass monitor.on_improvement and monitor.should_stop to any solver
+    that accepts them; should_stop() turns True once the gap of the best
+    route is at most target_gap. Existing callbacks can be chained.
+    """
+    def __init__(self, bound: int, target_gap: Optional[float] = None,
+                 on_improvement: Optional[Callable[[List[int], int], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None):
+        self.bound = bound
+        self.target_gap = target_gap
+        self.best_cost = INF
+        self.gap = INF
+        self._on_improvement = on_improvement
+        self._should_stop = should_stop
+
+    def on_improvement(self, route: List[int], cost: int):
+        if cost < self.best_cost:
+            self.best_cost = cost
+            self.gap = optimality_gap(cost, self.bound)
+        if self._on_improvement:
+            self._on_improvement(route, cost)
+
+    def should_stop(self) -> bool:
+        if self.target_gap is not None and self.gap <= self.target_gap:
+            return True
+        return bool(self._should_stop and self._should_stop())
+
+
+def format_gap(cost: float, bound: float) -> str:
+    return f"cost={cost} lower_bound={bound} gap={optimality_gap(cost, bound) * 100:.2f}%"
+
+
+def solve_with_gap(solve: Callable[..., Tuple[List[int], int]], tsp: TSPTimeWindows,
+                   target_gap: Optional[float] = None, bound_time_limit: float = 5.0,
+                   **kwargs) -> Tuple[List[int], int, int, float]:
+    """
+    Run an anytime solver (any callable taking on_improvement/should_stop)
+    and stop once the gap drops to target_gap
+    Returns (best_route, best_cost, lower_bound, gap)
+    """
+    bound = lower_bound(tsp, time_limit=bound_time_limit)
+    monitor = GapMonitor(bound, target_gap, kwargs.pop("on_improvement", None), kwargs.pop("should_stop", None))
+    route, cost = solve(on_improvement=monitor.on_improvement, should_stop=monitor.should_stop, **kwargs)
+    return route, cost, bound, optimality_gap(cost, bound)
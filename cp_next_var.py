@@ -1,4 +1,9 @@
+import math
+from fractions import Fraction
+
 from ortools.sat.python import cp_model
+from local_search import TSPTimeWindows, objective_weights
+from validator import self_check
 
 def read_input():
     with open("input.txt") as f:
@@ -13,8 +18,21 @@ def read_input():
     t = [list(map(int, lines[i].split())) for i in range(n + 1, 2*n + 2)]
     return n, e, l, d, t
 
-def solve_delivery_route():
+def integer_weights(weights, max_scale=10**6):
+    """
+    CP-SAT needs integer coefficients: scale the objective weights by the
+    smallest common multiplier that makes them all integral.
+    Returns (integer_weights, scale).
+    """
+    fractions = [Fraction(str(w)) for w in weights]
+    scale = math.lcm(*(f.denominator for f in fractions))
+    if scale > max_scale:
+        raise ValueError(f"Objective weights {tuple(weights)} need a scale of {scale} to become integers")
+    return tuple(int(f * scale) for f in fractions), scale
+
+def solve_delivery_route(objective="travel", weights=None, hint_route=None):
     N, e, l, d, t = read_input()
+    (w_travel, w_completion, w_waiting), scale = integer_weights(objective_weights(objective, weights))
     t0 = 0  # Starting time at warehouse
     M = 10**6  # Big-M for timing constraints
 
@@ -64,13 +82,35 @@ def solve_delivery_route():
                 model.Add(T[j - 1] >= T[i - 1] + d[i] + t[i][j]).OnlyEnforceIf(arc[i][j])
             # No timing constraint needed for next[i] = N+1 (end)
 
-    # Objective: Minimize total travel time
+    # Travel time, including the return leg (arc to N+1 means back to depot)
     travel_time = []
     for i in range(N + 1):
-        for j in range(1, N + 1):  # Exclude N+1 in objective
+        for j in range(1, N + 1):
             if i != j:
                 travel_time.append(t[i][j] * arc[i][j])
-    model.Minimize(sum(travel_time))
+    for i in range(1, N + 1):
+        travel_time.append(t[i][0] * arc[i][N + 1])
+    total_travel = sum(travel_time)
+
+    # Completion time: back at the depot after the last customer
+    horizon = max(l[1:]) + max(d) + max(max(row) for row in t)
+    completion = model.NewIntVar(t0, horizon, 'completion')
+    for i in range(1, N + 1):
+        model.Add(completion >= T[i - 1] + d[i] + t[i][0]).OnlyEnforceIf(arc[i][N + 1])
+
+    # Waiting is whatever time is neither travel nor service
+    waiting = completion - t0 - total_travel - sum(d)
+
+    # Objective: same definition as TSPTimeWindows.fast_feasibility_check
+    model.Minimize(w_travel * total_travel + w_completion * completion + w_waiting * waiting)
+
+    # Warm start: hint a known route (e.g. from solution_pool) to the solver
+    if hint_route is not None and sorted(hint_route) == list(range(1, N + 1)):
+        successor = dict(zip([0] + hint_route, hint_route + [N + 1]))
+        for i in range(N + 1):
+            model.AddHint(next_vars[i], successor[i])
+            for j, var in arc[i].items():
+                model.AddHint(var, j == successor[i])
 
     # Solve the model
     solver = cp_model.CpSolver()
@@ -78,7 +118,8 @@ def solve_delivery_route():
 
     if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
         # Extract the route\
-        print("Optimal solution", solver.ObjectiveValue())
+        objective_value = solver.ObjectiveValue() / scale
+        print("Optimal solution", objective_value)
         route = []
         current = 0
         while True:
@@ -87,6 +128,8 @@ def solve_delivery_route():
                 break
             route.append(next_node)
             current = next_node
+        tsp = TSPTimeWindows(N, list(zip(e[1:], l[1:], d[1:])), t, start_time=t0, objective=objective, weights=weights)
+        self_check(tsp, route, objective_value, "CP-SAT")
         # Output
         print(N)
         print(' '.join(map(str, route)))
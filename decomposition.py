@@ -0,0 +1,413 @@
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from alns import ALNS
+from bounds import format_gap, lower_bound
+from local_search import TSPTimeWindows, read_instance
+from validator import self_check
+
+INF = float('inf')
+
+
+def _dominates(a: Tuple, b: Tuple, waiting_matters: bool) -> bool:
+    """
+    Label a = (travel, waiting, departure, ...) is at least as good as b
+    """
+    if a[0] > b[0] or a[2] > b[2]:
+        return False
+    # An earlier label can always wait to match a later one
+    return not waiting_matters or a[1] + (b[2] - a[2]) <= b[1]
+
+
+def _add_label(bucket: List[Tuple], label: Tuple, waiting_matters: bool, limit: Optional[int] = None):
+    if any(_dominates(other, label, waiting_matters) for other in bucket):
+        return
+    bucket[:] = [other for other in bucket if not _dominates(label, other, waiting_matters)]
+    bucket.append(label)
+    if limit is not None and len(bucket) > limit:
+        bucket.sort()
+        del bucket[limit:]
+
+
+def solve_exact(tsp: TSPTimeWindows) -> Optional[Tuple[List[int], int]]:
+    """
+    Exact label-setting DP over (visited set, last customer) for small instances
+    Labels are (travel, waiting, departure) and only Pareto-optimal ones are
+    kept, so the result is optimal for every objective.
+    Returns None if the instance is infeasible.
+    """
+    n = tsp.n
+    t = tsp.travel_matrix
+    waiting_matters = tsp.objective_weights[2] > 0
+
+    # labels[(mask, last)] = list of (travel, waiting, departure, parent label)
+    labels: Dict[Tuple[int, int], List[Tuple]] = {(0, 0): [(0, 0, tsp.start_time, None)]}
+    for size in range(n):
+        layer = {key: value for key, value in labels.items() if bin(key[0]).count("1") == size}
+        for (mask, last), entries in layer.items():
+            for customer in range(1, n + 1):
+                bit = 1 << (customer - 1)
+                if mask & bit:
+                    continue
+                earliest, latest, service_duration = tsp.time_windows[customer - 1]
+                for entry in entries:
+                    travel, waiting, departure, _ = entry
+                    arrival = departure + t[last][customer]
+                    if arrival > latest:
+                        continue
+                    label = (travel + t[last][customer], waiting + max(0, earliest - arrival),
+                             max(arrival, earliest) + service_duration, (last, entry))
+                    _add_label(labels.setdefault((mask | bit, customer), []), label, waiting_matters)
+
+    full = (1 << n) - 1
+    best = None
+    for last in range(1, n + 1):
+        for label in labels.get((full, last), []):
+            travel, waiting, departure, _ = label
+            cost = tsp.objective_value(travel + t[last][0], waiting, departure + t[last][0])
+            if best is None or cost < best[0]:
+                best = (cost, last, label)
+
+    if n == 0:
+        return [], tsp.fast_feasibility_check([])[0]
+    if best is None:
+        return None
+
+    cost, last, label = best
+    route = []
+    while label[3] is not None:
+        route.append(last)
+        last, label = label[3]
+    route.reverse()
+    return route, cost
+
+
+def window_dp(tsp: TSPTimeWindows, order: List[int], k: int = 5, labels_per_state: int = 4) -> Optional[List[int]]:
+    """
+    Best route among the reorderings of order in which no customer is
+    overtaken by one more than k - 1 places behind it (Balas-Simonetti
+    neighbourhood), in O(len(order) * k * 2^k) label extensions
+    Returns None if no such reordering is feasible.
+    """
+    n = len(order)
+    t = tsp.travel_matrix
+    waiting_matters = tsp.objective_weights[2] > 0
+
+    # State (base, mask, last): order[:base] are placed, bit b of mask tells
+    # whether order[base + b] is placed (bit 0 is always clear), last is
+    # the index in order of the last customer (-1 for the depot)
+    stage = {(0, 0, -1): [(0, 0, tsp.start_time, None)]}
+    for _ in range(n):
+        following = {}
+        for (base, mask, last), entries in stage.items():
+            location = order[last] if last >= 0 else 0
+            for b in range(min(k, n - base)):
+                if mask >> b & 1:
+                    continue
+                index = base + b
+                customer = order[index]
+                earliest, latest, service_duration = tsp.time_windows[customer - 1]
+                travel_time = t[location][customer]
+                new_base, new_mask = base, mask | (1 << b)
+                while new_mask & 1:
+                    new_mask >>= 1
+                    new_base += 1
+                key = (new_base, new_mask, index)
+                for entry in entries:
+                    travel, waiting, departure, _ = entry
+                    arrival = departure + travel_time
+                    if arrival > latest:
+                        continue
+                    label = (travel + travel_time, waiting + max(0, earliest - arrival),
+                             max(arrival, earliest) + service_duration, (last, entry))
+                    _add_label(following.setdefault(key, []), label, waiting_matters, labels_per_state)
+        stage = following
+        if not stage:
+            return None
+
+    best = None
+    for (_, _, last), entries in stage.items():
+        customer = order[last]
+        for label in entries:
+            travel, waiting, departure, _ = label
+            cost = tsp.objective_value(travel + t[customer][0], waiting, departure + t[customer][0])
+            if best is None or cost < best[0]:
+                best = (cost, last, label)
+
+    _, last, label = best
+    route = []
+    while label[3] is not None:
+        route.append(order[last])
+        last, label = label[3]
+    route.reverse()
+    return route
+
+
+def _solve_cluster(job: Tuple) -> Tuple[List[int], int]:
+    """
+    Worker: solve one cluster sub-instance with the method suited to its size
+    """
+    (n, time_windows, travel_matrix, start_time, objective, weights,
+     exact_limit, window_dp_limit, time_limit, seed) = job
+    tsp = TSPTimeWindows(n, time_windows, travel_matrix, start_time, objective=objective, weights=weights, seed=seed)
+
+    if n <= exact_limit:
+        result = solve_exact(tsp)
+        if result is not None:
+            return result
+
+    # Customers arrive in window-midpoint order, which is usually close to
+    # feasible; reordering it locally is far more reliable than the generic constructions
+    order = list(range(1, n + 1))
+    if n <= window_dp_limit:
+        route = window_dp(tsp, order)
+        if route is not None:
+            return tsp.local_search_optimized(time_limit * 0.25, initial_route=route)
+
+    alns = ALNS(tsp, seed=seed)
+    initial_route = alns.repair_route(order) or window_dp(tsp, order)
+    return alns.solve(initial_route=initial_route, time_limit=time_limit, polish_best=True)
+
+
+class DecompositionSolver:
+    """
+    Decompose-solve-stitch for very large instances
+
+    Customers are sorted by time-window midpoint and first cut wherever the
+    windows separate completely (every window before the cut closes before
+    any window after it opens, so no route can interleave the two sides).
+    Separated groups of at most exact_limit customers are merged, larger
+    ones are cut into clusters of about cluster_size, preferring cuts at
+    the widest gaps between windows. Every cluster becomes a small
+    TSPTimeWindows instance that starts at the previous cluster's latest
+    customer and ends towards the next cluster's earliest one. Clusters are
+    solved in parallel by size: exact DP up to exact_limit customers,
+    window DP plus local search up to window_dp_limit, ALNS otherwise.
+    They are then concatenated, repaired where the boundaries break
+    windows and finally polished as one route.
+    """
+    def __init__(self, tsp: TSPTimeWindows, cluster_size: int = 150, exact_limit: int = 10,
+                 window_dp_limit: int = 40, cluster_time_limit: float = 2.0, polish_time_limit: Optional[float] = None,
+                 workers: int = 1, seed: Optional[int] = None):
+        self.tsp = tsp
+        self.cluster_size = cluster_size
+        self.exact_limit = exact_limit
+        self.window_dp_limit = window_dp_limit
+        self.cluster_time_limit = cluster_time_limit
+        self.polish_time_limit = polish_time_limit
+        self.workers = workers
+        self.random = random.Random(seed)
+        self.alns = ALNS(tsp, seed=seed)
+
+    def partition(self) -> List[List[int]]:
+        """
+        Time-ordered clusters of customers
+        """
+        windows = self.tsp.time_windows
+        order = sorted(range(1, self.tsp.n + 1), key=lambda c: windows[c - 1][0] + windows[c - 1][1])
+
+        clusters = []
+        small: List[int] = []
+        for segment in self._separated_segments(order):
+            if len(segment) <= self.exact_limit:
+                if len(small) + len(segment) > self.exact_limit:
+                    clusters.append(small)
+                    small = []
+                small.extend(segment)
+                continue
+            if small:
+                clusters.append(small)
+                small = []
+            clusters.extend(self._split(segment))
+        if small:
+            clusters.append(small)
+        return clusters
+
+    def _separated_segments(self, order: List[int]) -> List[List[int]]:
+        """
+        Cut order where every earlier window closes before every later one opens
+        """
+        windows = self.tsp.time_windows
+        suffix_earliest = [INF] * (len(order) + 1)
+        for k in range(len(order) - 1, -1, -1):
+            suffix_earliest[k] = min(suffix_earliest[k + 1], windows[order[k] - 1][0])
+
+        segments = []
+        start = 0
+        prefix_latest = -INF
+        for k in range(1, len(order)):
+            prefix_latest = max(prefix_latest, windows[order[k - 1] - 1][1])
+            if prefix_latest < suffix_earliest[k]:
+                segments.append(order[start:k])
+                start = k
+        segments.append(order[start:])
+        return segments
+
+    def _split(self, order: List[int]) -> List[List[int]]:
+        """
+        Cut order into clusters of about cluster_size at the widest midpoint gaps
+        """
+        windows = self.tsp.time_windows
+        if len(order) <= self.cluster_size:
+            return [order]
+
+        clusters = []
+        start = 0
+        slack = max(1, self.cluster_size // 4)
+        while len(order) - start > self.cluster_size + slack:
+            # Cut at the widest midpoint gap within +-25% of the target size
+            low = start + self.cluster_size - slack
+            high = start + self.cluster_size + slack
+            cut = max(range(low, high + 1),
+                      key=lambda k: (windows[order[k] - 1][0] + windows[order[k] - 1][1])
+                      - (windows[order[k - 1] - 1][0] + windows[order[k - 1] - 1][1]))
+            clusters.append(order[start:cut])
+            start = cut
+        clusters.append(order[start:])
+        return clusters
+
+    def _sub_instance(self, customers: List[int], start_node: int, start_time: int, end_node: int,
+                      time_limit: float) -> Tuple:
+        """
+        Sub-instance over customers: node 0 departs from start_node at
+        start_time and the return leg goes to end_node
+        """
+        t = self.tsp.travel_matrix
+        nodes = [start_node] + customers
+        matrix = [[t[i][j] for j in nodes] for i in nodes]
+        for k, customer in enumerate(customers, start=1):
+            matrix[k][0] = t[customer][end_node]
+        matrix[0][0] = 0
+        time_windows = [self.tsp.time_windows[c - 1] for c in customers]
+        weights = dict(zip(("travel", "completion", "waiting"), self.tsp.objective_weights))
+        return (len(customers), time_windows, matrix, start_time, self.tsp.objective, weights,
+                self.exact_limit, self.window_dp_limit, time_limit, self.random.randrange(1 << 30))
+
+    def _jobs(self, clusters: List[List[int]], time_limit: float) -> List[Tuple]:
+        windows = self.tsp.time_windows
+        jobs = []
+        for k, customers in enumerate(clusters):
+            if k == 0:
+                start_node, start_time = 0, self.tsp.start_time
+            else:
+                # Most likely last customer of the previous cluster
+                start_node = max(clusters[k - 1], key=lambda c: windows[c - 1][0] + windows[c - 1][1])
+                start_time = windows[start_node - 1][0] + windows[start_node - 1][2]
+            if k + 1 < len(clusters):
+                end_node = min(clusters[k + 1], key=lambda c: windows[c - 1][0] + windows[c - 1][1])
+            else:
+                end_node = 0
+            jobs.append(self._sub_instance(customers, start_node, start_time, end_node, time_limit))
+        return jobs
+
+    def polish_boundaries(self, route: List[int], boundaries: List[int], width: int = 15,
+                          deadline: Optional[float] = None) -> Tuple[List[int], int]:
+        """
+        Exhaustive relocate and 2-opt restricted to a window around each cluster boundary
+        Moves are evaluated on the affected slice only, against the schedule
+        of the current route, which is updated in place when a move is taken.
+        """
+        cost, feasible = self.tsp.fast_feasibility_check(route)
+        if not feasible:
+            return route, cost
+        state = self.tsp.route_state(route)
+        route = state.route
+
+        for boundary in boundaries:
+            if deadline is not None and time.time() >= deadline:
+                break
+            low = max(0, boundary - width)
+            high = min(len(route), boundary + width)
+            improved = True
+            while improved:
+                improved = False
+                for i in range(low, high):
+                    for j in range(low, high):
+                        if i == j:
+                            continue
+                        # Relocate route[i] to position j
+                        first, last = min(i, j), max(i, j)
+                        segment = route[first:last + 1]
+                        if i < j:
+                            segment.append(segment.pop(0))
+                        else:
+                            segment.insert(0, segment.pop())
+                        new_cost, new_feasible = self.tsp.evaluate_segment(state, first, segment)
+                        if not (new_feasible and new_cost < cost) and i < j - 1:
+                            # Reverse route[i..j]
+                            segment = route[i:j + 1][::-1]
+                            new_cost, new_feasible = self.tsp.evaluate_segment(state, first, segment)
+                        if new_feasible and new_cost < cost:
+                            self.tsp.update_state(state, first, segment)
+                            cost = new_cost
+                            improved = True
+        return route, cost
+
+    def solve(self, time_limit: Optional[float] = None) -> Tuple[List[int], int]:
+        """
+        Returns (best_route, best_cost)
+        time_limit bounds the whole solve: cluster time limits shrink so that
+        the clusters, one round per worker, take at most about 60% of it,
+        boundary polishing stops at the deadline and the final polish gets
+        what is left. Exact and window DP clusters cannot be interrupted, so
+        a very tight limit can still be overrun.
+        """
+        start_time = time.time()
+        deadline = start_time + time_limit if time_limit is not None else None
+        clusters = self.partition()
+        cluster_time = self.cluster_time_limit
+        if time_limit is not None and clusters:
+            rounds = -(-len(clusters) // max(1, self.workers))
+            cluster_time = min(cluster_time, 0.6 * time_limit / rounds)
+        jobs = self._jobs(clusters, cluster_time)
+
+        if self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(_solve_cluster, jobs))
+        else:
+            results = [_solve_cluster(job) for job in jobs]
+
+        # Stitch: map sub-instance indices back to customers
+        route = []
+        boundaries = []
+        for customers, (sub_route, _) in zip(clusters, results):
+            if route:
+                boundaries.append(len(route))
+            route.extend(customers[k - 1] for k in sub_route)
+
+        _, feasible = self.tsp.fast_feasibility_check(route)
+        if not feasible:
+            repaired = self.alns.repair_route(route) or window_dp(self.tsp, route)
+            if repaired is None:
+                print("Warning: stitched route could not be repaired", file=sys.stderr)
+                return route, self.tsp.fast_feasibility_check(route)[0]
+            route = repaired
+        route, cost = self.polish_boundaries(route, boundaries, deadline=deadline)
+
+        polish_time = self.polish_time_limit if self.polish_time_limit is not None else 0.002 * self.tsp.n
+        if time_limit is not None:
+            polish_time = min(polish_time, max(0.0, deadline - time.time()))
+        if polish_time > 0:
+            route, cost = self.tsp.local_search_optimized(polish_time, initial_route=route)
+        self_check(self.tsp, route, cost, "decomposition")
+        return route, cost
+
+
+def solve_tsp_time_windows_decomposition():
+    """Main function to solve very large TSP with Time Windows instances by decomposition"""
+    n, time_windows, travel_matrix = read_instance()
+
+    tsp = TSPTimeWindows(n, time_windows, travel_matrix)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    best_route, best_cost = DecompositionSolver(tsp, workers=workers).solve()
+
+    print(n)
+    print(*best_route)
+    print(best_cost)
+    print(format_gap(best_cost, lower_bound(tsp, upper_bound=best_cost)), file=sys.stderr)
+
+if __name__ == "__main__":
+    solve_tsp_time_windows_decomposition()
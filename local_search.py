@@ -1,34 +1,98 @@
 import random
 import time
-from typing import List, Tuple, Optional
+from typing import Callable, List, Tuple, Optional
 import sys
 from collections import defaultdict
 
+from validator import self_check
+
+OBJECTIVES = ("travel", "completion", "waiting", "weighted")
+
+def objective_weights(objective: str = "travel", weights: Optional[dict] = None) -> Tuple[float, float, float]:
+    """
+    Weights (travel, completion, waiting) of the route objective
+    travel: summed travel time including the return to the depot
+    completion: time the vehicle is back at the depot
+    waiting: total time spent waiting for windows to open
+    weighted: weights["travel"] * travel + weights["completion"] * completion + weights["waiting"] * waiting
+    """
+    if objective == "travel":
+        return 1, 0, 0
+    if objective == "completion":
+        return 0, 1, 0
+    if objective == "waiting":
+        return 0, 0, 1
+    if objective == "weighted":
+        weights = weights or {}
+        unknown = set(weights) - {"travel", "completion", "waiting"}
+        if unknown:
+            raise ValueError(f"Unknown objective weights: {sorted(unknown)}")
+        result = (weights.get("travel", 0), weights.get("completion", 0), weights.get("waiting", 0))
+        if min(result) < 0:
+            raise ValueError("Objective weights must be non-negative")
+        return result
+    raise ValueError(f"Unknown objective: {objective}")
+
+class RouteState:
+    """
+    Prefix schedule of a feasible route, used for incremental evaluation
+    departure[k], travel[k] and waiting[k] are the time the vehicle leaves
+    position k and the travel/waiting accumulated up to it (position 0 is
+    the depot, position k is route[k - 1])
+    """
+    __slots__ = ("route", "departure", "travel", "waiting", "total_travel", "total_waiting", "completion")
+
+    def __init__(self, route: List[int]):
+        self.route = route
+        self.departure = []
+        self.travel = []
+        self.waiting = []
+        self.total_travel = 0
+        self.total_waiting = 0
+        self.completion = 0
+
 class TSPTimeWindows:
-    def __init__(self, n: int, time_windows: List[Tuple[int, int, int]], travel_matrix: List[List[int]], start_time: int = 0):
+    def __init__(self, n: int, time_windows: List[Tuple[int, int, int]], travel_matrix: List[List[int]], start_time: int = 0,
+                 objective: str = "travel", weights: Optional[dict] = None, seed: Optional[int] = None):
         """
         Initialize TSP with Time Windows problem - Optimized for large instances
+        objective selects what fast_feasibility_check returns (see objective_weights)
+        seed gives the heuristics a private random generator instead of the random module
         """
         self.n = n
         self.time_windows = time_windows  # e(i), l(i), d(i) for customers 1..n
         self.travel_matrix = travel_matrix
         self.start_time = start_time
+        self.objective = objective
+        self.objective_weights = objective_weights(objective, weights)
+        self.travel_only = self.objective_weights[1] == 0 and self.objective_weights[2] == 0
+        self.random = random.Random(seed) if seed is not None else random
+        self.warm_starts: List[List[int]] = []  # Candidate routes from earlier solves (see solution_pool)
         
         # Precompute useful data structures for speed
         self.customer_by_deadline = sorted(range(1, n + 1), key=lambda x: self.time_windows[x-1][1])
         self.customer_by_urgency = sorted(range(1, n + 1), key=lambda x: (self.time_windows[x-1][1] - self.time_windows[x-1][0]))
         
+    def objective_value(self, travel: int, waiting: int, completion: int) -> int:
+        """
+        Combine travel, waiting and completion time into the objective
+        """
+        w_travel, w_completion, w_waiting = self.objective_weights
+        return w_travel * travel + w_completion * completion + w_waiting * waiting
+    
     def fast_feasibility_check(self, route: List[int]) -> Tuple[int, bool]:
         """
         Fast feasibility check with early termination
-        Returns (total_travel_time, is_feasible)
+        Returns (objective_value, is_feasible); with the default objective
+        the value is the total travel time including the return to the depot
         """
         if not route:
-            return 0, True
+            return self.objective_value(0, 0, self.start_time), True
         
         current_time = self.start_time
         current_location = 0
         total_travel_time = 0
+        total_waiting_time = 0
         
         for customer in route:
             # Travel to customer
@@ -41,6 +105,7 @@ class TSPTimeWindows:
             
             # Wait if early
             if current_time < earliest:
+                total_waiting_time += earliest - current_time
                 current_time = earliest
             
             # Early termination if too late
@@ -52,9 +117,164 @@ class TSPTimeWindows:
             current_location = customer
         
         # Return to depot
-        total_travel_time += self.travel_matrix[current_location][0]
-        return total_travel_time, True
+        travel_time = self.travel_matrix[current_location][0]
+        total_travel_time += travel_time
+        return self.objective_value(total_travel_time, total_waiting_time, current_time + travel_time), True
     
+    def route_state(self, route: List[int]) -> RouteState:
+        """
+        Prefix schedule of route for evaluate_change (route must be feasible)
+        """
+        state = RouteState(route[:])
+        current_time = self.start_time
+        current_location = 0
+        total_travel_time = 0
+        total_waiting_time = 0
+        state.departure.append(current_time)
+        state.travel.append(0)
+        state.waiting.append(0)
+        
+        for customer in route:
+            travel_time = self.travel_matrix[current_location][customer]
+            total_travel_time += travel_time
+            current_time += travel_time
+            earliest, _, service_duration = self.time_windows[customer - 1]
+            if current_time < earliest:
+                total_waiting_time += earliest - current_time
+                current_time = earliest
+            current_time += service_duration
+            current_location = customer
+            state.departure.append(current_time)
+            state.travel.append(total_travel_time)
+            state.waiting.append(total_waiting_time)
+        
+        travel_time = self.travel_matrix[current_location][0]
+        state.total_travel = total_travel_time + travel_time
+        state.total_waiting = total_waiting_time
+        state.completion = current_time + travel_time
+        return state
+    
+    def evaluate_change(self, route: List[int], state: RouteState, first: int, last: int) -> Tuple[int, bool]:
+        """
+        Incremental fast_feasibility_check of route, a same-length variant of
+        state.route that differs only at positions first..last
+        """
+        return self.evaluate_segment(state, first, route[first:last + 1])
+
+    def evaluate_segment(self, state: RouteState, first: int, segment: List[int]) -> Tuple[int, bool]:
+        """
+        fast_feasibility_check of state.route with positions first.. replaced
+        by segment (same length), without building that route
+        Only the segment is simulated; the suffix is reused as soon as the
+        schedule realigns with the old one (or, for the travel objective, as
+        soon as it runs no later than the old one).
+        """
+        route = state.route
+        last = first + len(segment) - 1
+        current_time = state.departure[first]
+        total_travel_time = state.travel[first]
+        total_waiting_time = state.waiting[first]
+        current_location = route[first - 1] if first > 0 else 0
+        
+        for position in range(first, len(route)):
+            customer = segment[position - first] if position <= last else route[position]
+            travel_time = self.travel_matrix[current_location][customer]
+            total_travel_time += travel_time
+            current_time += travel_time
+            
+            earliest, latest, service_duration = self.time_windows[customer - 1]
+            if current_time < earliest:
+                total_waiting_time += earliest - current_time
+                current_time = earliest
+            if current_time > latest:
+                return float('inf'), False
+            current_time += service_duration
+            current_location = customer
+            
+            if position > last:
+                old_departure = state.departure[position + 1]
+                if current_time == old_departure or (self.travel_only and current_time < old_departure):
+                    # Same customers from here on and no later than before: reuse the old suffix
+                    travel = total_travel_time + state.total_travel - state.travel[position + 1]
+                    waiting = total_waiting_time + state.total_waiting - state.waiting[position + 1]
+                    return self.objective_value(travel, waiting, state.completion), True
+        
+        travel_time = self.travel_matrix[current_location][0]
+        total_travel_time += travel_time
+        return self.objective_value(total_travel_time, total_waiting_time, current_time + travel_time), True
+
+    def update_state(self, state: RouteState, first: int, segment: List[int]):
+        """
+        Write segment into state.route at positions first.. (same length, the
+        result must be feasible) and refresh the schedule only up to where it
+        realigns with the old one; later prefix sums are shifted in bulk
+        """
+        route = state.route
+        last = first + len(segment) - 1
+        route[first:last + 1] = segment
+        current_time = state.departure[first]
+        total_travel_time = state.travel[first]
+        total_waiting_time = state.waiting[first]
+        current_location = route[first - 1] if first > 0 else 0
+
+        for position in range(first, len(route)):
+            customer = route[position]
+            total_travel_time += self.travel_matrix[current_location][customer]
+            current_time += self.travel_matrix[current_location][customer]
+            earliest, _, service_duration = self.time_windows[customer - 1]
+            if current_time < earliest:
+                total_waiting_time += earliest - current_time
+                current_time = earliest
+            current_time += service_duration
+            current_location = customer
+
+            k = position + 1
+            if position > last and current_time == state.departure[k]:
+                travel_shift = total_travel_time - state.travel[k]
+                waiting_shift = total_waiting_time - state.waiting[k]
+                if travel_shift:
+                    state.travel[k:] = [value + travel_shift for value in state.travel[k:]]
+                    state.total_travel += travel_shift
+                if waiting_shift:
+                    state.waiting[k:] = [value + waiting_shift for value in state.waiting[k:]]
+                    state.total_waiting += waiting_shift
+                return
+            state.departure[k] = current_time
+            state.travel[k] = total_travel_time
+            state.waiting[k] = total_waiting_time
+
+        travel_time = self.travel_matrix[current_location][0]
+        state.total_travel = total_travel_time + travel_time
+        state.total_waiting = total_waiting_time
+        state.completion = current_time + travel_time
+
+    def evaluate_tail(self, state: RouteState, keep: int, tail: List[int]) -> Tuple[int, bool]:
+        """
+        fast_feasibility_check of state.route[:keep] + tail, simulating only tail
+        """
+        current_time = state.departure[keep]
+        total_travel_time = state.travel[keep]
+        total_waiting_time = state.waiting[keep]
+        current_location = state.route[keep - 1] if keep > 0 else 0
+
+        for customer in tail:
+            travel_time = self.travel_matrix[current_location][customer]
+            total_travel_time += travel_time
+            current_time += travel_time
+
+            earliest, latest, service_duration = self.time_windows[customer - 1]
+            if current_time < earliest:
+                total_waiting_time += earliest - current_time
+                current_time = earliest
+            if current_time > latest:
+                return float('inf'), False
+            current_time += service_duration
+            current_location = customer
+
+        travel_time = self.travel_matrix[current_location][0]
+        total_travel_time += travel_time
+        return self.objective_value(total_travel_time, total_waiting_time, current_time + travel_time), True
+
     def construct_solution_nearest_neighbor_with_time(self) -> Optional[List[int]]:
         """
         Fast construction using nearest neighbor with time window awareness
@@ -169,6 +389,14 @@ class TSPTimeWindows:
         """
         solutions = []
         
+        # Warm starts from similar past instances
+        for route in self.warm_starts:
+            if len(route) != self.n or set(route) != set(range(1, self.n + 1)):
+                continue
+            cost, feasible = self.fast_feasibility_check(route)
+            if feasible:
+                solutions.append((route[:], cost))
+        
         # Try nearest neighbor
         sol1 = self.construct_solution_nearest_neighbor_with_time()
         if sol1:
@@ -186,7 +414,7 @@ class TSPTimeWindows:
         # Try random solutions (quick generation)
         for _ in range(3):
             random_route = self.customer_by_deadline[:]
-            random.shuffle(random_route)
+            self.random.shuffle(random_route)
             cost, feasible = self.fast_feasibility_check(random_route)
             if feasible:
                 solutions.append((random_route, cost))
@@ -208,6 +436,7 @@ class TSPTimeWindows:
         if not feasible:
             return current_route, current_cost
         
+        state = self.route_state(current_route)
         improved = True
         attempts = 0
         
@@ -217,7 +446,7 @@ class TSPTimeWindows:
             
             # Randomize order of attempts for better exploration
             indices = list(range(len(current_route)))
-            random.shuffle(indices)
+            self.random.shuffle(indices)
             
             for i in indices[:min(50, len(indices))]:  # Limit attempts
                 for j in range(i + 2, min(i + 20, len(current_route))):  # Local window
@@ -225,11 +454,12 @@ class TSPTimeWindows:
                     new_route = current_route[:]
                     new_route[i:j+1] = reversed(new_route[i:j+1])
                     
-                    new_cost, new_feasible = self.fast_feasibility_check(new_route)
+                    new_cost, new_feasible = self.evaluate_change(new_route, state, i, j)
                     
                     if new_feasible and new_cost < current_cost:
                         current_route = new_route
                         current_cost = new_cost
+                        state = self.route_state(current_route)
                         improved = True
                         break
                 
@@ -248,6 +478,7 @@ class TSPTimeWindows:
         if not feasible:
             return current_route, current_cost
         
+        state = self.route_state(current_route)
         improved = True
         attempts = 0
         
@@ -275,11 +506,12 @@ class TSPTimeWindows:
                     insert_pos = j if j < i else j - 1
                     new_route.insert(insert_pos, customer)
                     
-                    new_cost, new_feasible = self.fast_feasibility_check(new_route)
+                    new_cost, new_feasible = self.evaluate_change(new_route, state, min(i, insert_pos), max(i, insert_pos))
                     
                     if new_feasible and new_cost < current_cost:
                         current_route = new_route
                         current_cost = new_cost
+                        state = self.route_state(current_route)
                         improved = True
                         break
                 
@@ -288,14 +520,19 @@ class TSPTimeWindows:
         
         return current_route, current_cost
     
-    def local_search_optimized(self, time_limit: float = 30.0) -> Tuple[List[int], int]:
+    def local_search_optimized(self, time_limit: float = 30.0,
+                               on_improvement: Optional[Callable[[List[int], int], None]] = None,
+                               should_stop: Optional[Callable[[], bool]] = None,
+                               initial_route: Optional[List[int]] = None) -> Tuple[List[int], int]:
         """
         Optimized local search with time limit and adaptive strategies
+        on_improvement(route, cost) is called for every new best route,
+        should_stop() is polled once per iteration to allow cancellation
         """
         start_time = time.time()
         
         # Get initial solution
-        current_route = self.get_initial_solution()
+        current_route = initial_route[:] if initial_route is not None else self.get_initial_solution()
         current_cost, feasible = self.fast_feasibility_check(current_route)
         
         if not feasible:
@@ -304,10 +541,14 @@ class TSPTimeWindows:
         
         best_route = current_route[:]
         best_cost = current_cost
+        if on_improvement:
+            on_improvement(best_route[:], best_cost)
         
         iteration = 0
         
         while time.time() - start_time < time_limit:
+            if should_stop and should_stop():
+                break
             iteration += 1
             
             # Apply 2-opt
@@ -323,33 +564,47 @@ class TSPTimeWindows:
                 if new_cost < best_cost:
                     best_route = new_route[:]
                     best_cost = new_cost
+                    if on_improvement:
+                        on_improvement(best_route[:], best_cost)
             else:
                 # Diversification: small random perturbation
                 if iteration % 10 == 0 and len(current_route) > 4:
                     # Swap two random customers
-                    i, j = random.sample(range(len(current_route)), 2)
+                    i, j = self.random.sample(range(len(current_route)), 2)
                     current_route[i], current_route[j] = current_route[j], current_route[i]
                     current_cost, _ = self.fast_feasibility_check(current_route)
         
+        self_check(self, best_route, best_cost, "local search")
         return best_route, best_cost
 
-def solve_tsp_time_windows():
-    """Main function to solve TSP with Time Windows - Optimized Version"""
-    # Read input
-    n = int(input().strip())
+def read_instance(stream=None) -> Tuple[int, List[Tuple[int, int, int]], List[List[int]]]:
+    """
+    Read an instance in the input.txt format from a stream (stdin by default)
+    Returns (n, time_windows, travel_matrix)
+    """
+    stream = stream if stream is not None else sys.stdin
+    
+    n = int(stream.readline().strip())
     
     # Read time windows
     time_windows = []
     for i in range(n):
-        e, l, d = map(int, input().strip().split())
+        e, l, d = map(int, stream.readline().strip().split())
         time_windows.append((e, l, d))
     
     # Read travel matrix
     travel_matrix = []
     for i in range(n + 1):
-        row = list(map(int, input().strip().split()))
+        row = list(map(int, stream.readline().strip().split()))
         travel_matrix.append(row)
     
+    return n, time_windows, travel_matrix
+
+def solve_tsp_time_windows():
+    """Main function to solve TSP with Time Windows - Optimized Version"""
+    # Read input
+    n, time_windows, travel_matrix = read_instance()
+    
     # Create TSP solver
     tsp = TSPTimeWindows(n, time_windows, travel_matrix)
     
@@ -360,6 +615,10 @@ def solve_tsp_time_windows():
     print(n)
     print(*best_route)
     print(best_cost)
+    
+    # Report optimality gap
+    from bounds import format_gap, lower_bound
+    print(format_gap(best_cost, lower_bound(tsp, upper_bound=best_cost)), file=sys.stderr)
 
 if __name__ == "__main__":
     solve_tsp_time_windows()
\ No newline at end of file
@@ -0,0 +1,293 @@
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from alns import ALNS
+from bounds import format_gap, lower_bound
+from local_search import TSPTimeWindows, read_instance
+from validator import self_check
+
+
+class Individual:
+    """
+    A feasible route with its cost and cached broken-pairs distances
+    """
+    def __init__(self, route: List[int], cost: int):
+        self.route = route
+        self.cost = cost
+        self.fitness = 0.0
+
+        # successor[c] is the node visited after c (0 = back to depot)
+        self.successor = {}
+        previous = 0
+        for customer in route:
+            self.successor[previous] = customer
+            previous = customer
+        self.successor[previous] = 0
+
+        self.distances: Dict[int, float] = {}  # id(other) -> distance
+
+    def broken_pairs_distance(self, other: "Individual") -> float:
+        """
+        Fraction of arcs of this route that do not appear in other
+        """
+        key = id(other)
+        if key not in self.distances:
+            broken = sum(1 for a, b in self.successor.items() if other.successor.get(a) != b)
+            distance = broken / len(self.successor)
+            self.distances[key] = distance
+            other.distances[id(self)] = distance
+        return self.distances[key]
+
+
+class MemeticSolver:
+    """
+    Population-based memetic algorithm for TSP with Time Windows
+
+    Offspring are produced by order crossover, repaired with ALNS insertion
+    when the inherited order breaks time windows, and educated with
+    fast_2opt/fast_relocate. Survivors are chosen by a biased fitness that
+    mixes cost rank with broken-pairs diversity contribution, so the
+    population does not collapse onto a single route.
+    """
+    def __init__(self, tsp: TSPTimeWindows, population_size: int = 25, generation_size: int = 40,
+                 offspring_per_generation: int = 8, n_elite: int = 4, n_closest: int = 5,
+                 education_attempts: int = 100, workers: int = 1, seed: Optional[int] = None):
+        self.tsp = tsp
+        self.population_size = population_size  # mu
+        self.generation_size = generation_size  # lambda
+        self.offspring_per_generation = offspring_per_generation
+        self.n_elite = n_elite
+        self.n_closest = n_closest
+        self.education_attempts = education_attempts
+        self.workers = workers
+        self.random = random.Random(seed)
+        self.alns = ALNS(tsp, seed=seed)
+
+        self.population: List[Individual] = []
+        self.generations = 0
+
+    # ------------------------------------------------------------------
+    # Offspring construction (also runs in worker processes)
+    # ------------------------------------------------------------------
+
+    def order_crossover(self, parent_a: List[int], parent_b: List[int],
+                        rng: Optional[random.Random] = None) -> List[int]:
+        """
+        OX: keep a slice of parent_a in place, fill the rest in parent_b order
+        """
+        size = len(parent_a)
+        i, j = sorted((rng or self.random).sample(range(size + 1), 2))
+        kept = set(parent_a[i:j])
+        filler = [c for c in parent_b if c not in kept]
+        return filler[:i] + parent_a[i:j] + filler[i:]
+
+    def repair(self, route: List[int], rng: Optional[random.Random] = None) -> Optional[List[int]]:
+        """
+        Drop customers served too late and reinsert them with regret insertion
+        """
+        return self.alns.repair_route(route, rng=rng)
+
+    def educate(self, route: List[int]) -> Tuple[List[int], int]:
+        """
+        Local search education step
+        """
+        route, cost = self.tsp.fast_relocate(route, max_attempts=self.education_attempts)
+        return self.tsp.fast_2opt(route, max_attempts=self.education_attempts)
+
+    def make_offspring(self, parent_a: List[int], parent_b: List[int], seed: int) -> Optional[Tuple[List[int], int]]:
+        # Jobs get their own generator so the solver's own random stream is left alone
+        rng = random.Random(seed)
+        child = self.repair(self.order_crossover(parent_a, parent_b, rng), rng)
+        if child is None:
+            return None
+        route, cost = self.educate(child)
+        _, feasible = self.tsp.fast_feasibility_check(route)
+        return (route, cost) if feasible else None
+
+    def random_individual(self, seed: int) -> Optional[Tuple[List[int], int]]:
+        """
+        Insertion construction in jittered deadline order followed by education
+        """
+        rng = random.Random(seed)
+        jitter = [rng.random() for _ in range(self.tsp.n + 1)]
+        deadlines = [latest for _, latest, _ in self.tsp.time_windows]
+        spread = (max(deadlines) - min(deadlines)) * 0.1 if deadlines else 0
+        order = sorted(self.tsp.customer_by_deadline, key=lambda c: deadlines[c - 1] + spread * jitter[c])
+
+        route = []
+        for customer in order:
+            departure, latest = self.alns._schedule(route)
+            options = self.alns._best_insertions(route, customer, departure, latest, 1)
+            if not options:
+                return None
+            route.insert(options[0][1], customer)
+        return self.educate(route)
+
+    # ------------------------------------------------------------------
+    # Population management
+    # ------------------------------------------------------------------
+
+    def _add(self, route: List[int], cost: int) -> Individual:
+        individual = Individual(route, cost)
+        for other in self.population:
+            individual.broken_pairs_distance(other)
+        self.population.append(individual)
+        return individual
+
+    def _remove(self, individual: Individual):
+        self.population.remove(individual)
+        for other in self.population:
+            other.distances.pop(id(individual), None)
+
+    def _update_fitness(self):
+        """
+        Biased fitness: cost rank plus weighted diversity rank (lower is better)
+        """
+        size = len(self.population)
+        if size == 1:
+            self.population[0].fitness = 0.0
+            return
+
+        by_cost = sorted(self.population, key=lambda ind: ind.cost)
+        diversity = {}
+        for individual in self.population:
+            closest = sorted(individual.broken_pairs_distance(other)
+                             for other in self.population if other is not individual)
+            diversity[id(individual)] = sum(closest[:self.n_closest]) / min(self.n_closest, len(closest))
+        by_diversity = sorted(self.population, key=lambda ind: -diversity[id(ind)])
+        diversity_rank = {id(ind): rank for rank, ind in enumerate(by_diversity)}
+
+        diversity_weight = 1.0 - min(self.n_elite, size) / size
+        for rank, individual in enumerate(by_cost):
+            individual.fitness = (rank + diversity_weight * diversity_rank[id(individual)]) / (size - 1)
+
+    def _select_survivors(self):
+        while len(self.population) > self.population_size:
+            self._update_fitness()
+            clones = [ind for ind in self.population
+                      if any(ind.broken_pairs_distance(other) == 0.0
+                             for other in self.population if other is not ind)]
+            candidates = clones or self.population
+            self._remove(max(candidates, key=lambda ind: ind.fitness))
+
+    def _tournament(self) -> Individual:
+        a, b = self.random.sample(self.population, 2)
+        return a if a.fitness < b.fitness else b
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+
+    def solve(self, time_limit: float = 30.0,
+              on_improvement: Optional[Callable[[List[int], int], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[int], int]:
+        """
+        Run the memetic algorithm, evaluating offspring on self.workers processes
+        Returns (best_route, best_cost)
+        """
+        start_time = time.time()
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=((self.tsp.n, self.tsp.time_windows, self.tsp.travel_matrix, self.tsp.start_time,
+                           self.tsp.objective, dict(zip(("travel", "completion", "waiting"),
+                                                        self.tsp.objective_weights))),
+                          self.education_attempts))
+
+        try:
+            best_route, best_cost = None, float('inf')
+
+            def consider(route: List[int], cost: int):
+                nonlocal best_route, best_cost
+                self._add(route, cost)
+                if cost < best_cost:
+                    best_route, best_cost = route[:], cost
+                    if on_improvement:
+                        on_improvement(best_route[:], best_cost)
+
+            initial = self.tsp.get_initial_solution()
+            initial_cost, feasible = self.tsp.fast_feasibility_check(initial)
+            if feasible:
+                consider(*self.educate(initial))
+
+            def run_batch(jobs: List[Tuple]) -> List[Optional[Tuple[List[int], int]]]:
+                if executor is None:
+                    return [self.make_offspring(*job) if len(job) == 3 else self.random_individual(*job)
+                            for job in jobs]
+                return list(executor.map(_worker_job, jobs))
+
+            # Initial population from randomised insertion constructions
+            attempts = 0
+            while (len(self.population) < self.population_size and attempts < 4 * self.population_size
+                   and time.time() - start_time < time_limit):
+                batch = [(self.random.randrange(1 << 30),) for _ in range(max(1, self.workers))]
+                attempts += len(batch)
+                for result in run_batch(batch):
+                    if result is not None:
+                        consider(*result)
+
+            if best_route is None:
+                # Neither the baseline nor the randomised constructions found a feasible route
+                print("Warning: No feasible initial solution found", file=sys.stderr)
+                return initial, initial_cost
+
+            while time.time() - start_time < time_limit and len(self.population) >= 2:
+                if should_stop and should_stop():
+                    break
+                self.generations += 1
+                self._update_fitness()
+
+                jobs = []
+                for _ in range(self.offspring_per_generation):
+                    parent_a, parent_b = self._tournament(), self._tournament()
+                    jobs.append((parent_a.route, parent_b.route, self.random.randrange(1 << 30)))
+
+                for result in run_batch(jobs):
+                    if result is None:
+                        continue
+                    consider(*result)
+
+                if len(self.population) >= self.population_size + self.generation_size:
+                    self._select_survivors()
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        for individual in self.population:
+            if individual.cost < best_cost:
+                best_route, best_cost = individual.route[:], individual.cost
+        self_check(self.tsp, best_route, best_cost, "memetic")
+        return best_route, best_cost
+
+
+_worker_solver: Optional[MemeticSolver] = None
+
+def _init_worker(instance: Tuple, education_attempts: int):
+    global _worker_solver
+    _worker_solver = MemeticSolver(TSPTimeWindows(*instance), education_attempts=education_attempts)
+
+def _worker_job(job: Tuple) -> Optional[Tuple[List[int], int]]:
+    if len(job) == 3:
+        return _worker_solver.make_offspring(*job)
+    return _worker_solver.random_individual(*job)
+
+
+def solve_tsp_time_windows_memetic():
+    """Main function to solve TSP with Time Windows using the memetic algorithm"""
+    n, time_windows, travel_matrix = read_instance()
+
+    tsp = TSPTimeWindows(n, time_windows, travel_matrix)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    best_route, best_cost = MemeticSolver(tsp, workers=workers).solve()
+
+    print(n)
+    print(*best_route)
+    print(best_cost)
+    print(format_gap(best_cost, lower_bound(tsp, upper_bound=best_cost)), file=sys.stderr)
+
+if __name__ == "__main__":
+    solve_tsp_time_windows_memetic()
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from alns import ALNS
+from local_search import TSPTimeWindows, read_instance
+
+
+class SolutionPool:
+    """
+    Persistent store of solved routes for warm-starting similar instances
+
+    Customers are identified by external ids (customer_ids[i - 1] for
+    customer i, the instance index by default), so routes carry over
+    between days whose instances overlap. Each entry is keyed by its
+    objective and window signature: the set of (customer id, bucketed
+    window) tokens, with windows rounded to window_resolution. Lookups rank
+    entries by Jaccard similarity of customer ids and of signatures,
+    preferring entries solved for the same objective. At most max_entries
+    are kept; the least recently used entry is evicted first.
+    """
+    def __init__(self, path: Optional[str] = None, max_entries: int = 200, window_resolution: int = 15):
+        self.path = path
+        self.max_entries = max_entries
+        self.window_resolution = window_resolution
+        self.entries: Dict[str, dict] = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as error:
+            print(f"Warning: could not read solution pool {self.path}: {error}", file=sys.stderr)
+            return
+        self.entries = {entry["signature"]: entry for entry in data.get("entries", [])}
+        self._evict()
+
+    def save(self):
+        """Write the pool atomically, so a crashed run never leaves a broken file"""
+        if not self.path:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"entries": list(self.entries.values())}, f)
+        os.replace(temporary, self.path)
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            oldest = min(self.entries.values(), key=lambda entry: entry["last_used"])
+            del self.entries[oldest["signature"]]
+
+    # ------------------------------------------------------------------
+    # Keys and similarity
+    # ------------------------------------------------------------------
+
+    def _ids(self, tsp: TSPTimeWindows, customer_ids: Optional[List[Hashable]]) -> List[str]:
+        if customer_ids is None:
+            customer_ids = range(1, tsp.n + 1)
+        elif len(customer_ids) != tsp.n:
+            raise ValueError(f"Expected {tsp.n} customer ids, got {len(customer_ids)}")
+        return [str(customer) for customer in customer_ids]
+
+    def _tokens(self, tsp: TSPTimeWindows, ids: List[str]) -> List[str]:
+        resolution = self.window_resolution
+        return [f"{customer}:{earliest // resolution}:{latest // resolution}"
+                for customer, (earliest, latest, _) in zip(ids, tsp.time_windows)]
+
+    @staticmethod
+    def _objective(tsp: TSPTimeWindows) -> str:
+        """Costs are only comparable under the same objective and weights"""
+        return f"{tsp.objective}:" + ",".join(map(str, tsp.objective_weights))
+
+    @staticmethod
+    def _signature(objective: str, tokens: List[str]) -> str:
+        return hashlib.sha1("|".join([objective] + sorted(tokens)).encode()).hexdigest()
+
+    @staticmethod
+    def _jaccard(a: set, b: set) -> float:
+        if not a and not b:
+            return 1.0
+        return len(a & b) / len(a | b)
+
+    def similar(self, tsp: TSPTimeWindows, customer_ids: Optional[List[Hashable]] = None,
+                k: int = 3, min_similarity: float = 0.3) -> List[Tuple[float, dict]]:
+        """
+        The k entries most similar to tsp, as (similarity, entry) pairs
+        Similarity averages the Jaccard index of customer ids and of window tokens.
+        """
+        ids = self._ids(tsp, customer_ids)
+        id_set, token_set = set(ids), set(self._tokens(tsp, ids))
+        objective = self._objective(tsp)
+        scored = []
+        for entry in self.entries.values():
+            similarity = 0.5 * (self._jaccard(id_set, set(entry["route"]))
+                                + self._jaccard(token_set, set(entry["tokens"])))
+            if similarity >= min_similarity:
+                scored.append((similarity, entry))
+        # Costs of entries solved for another objective cannot be compared
+        scored.sort(key=lambda item: (-item[0], item[1]["objective"] != objective,
+                                      item[1]["cost"] if item[1]["objective"] == objective else 0))
+        return scored[:k]
+
+    # ------------------------------------------------------------------
+    # Store and warm start
+    # ------------------------------------------------------------------
+
+    def add(self, tsp: TSPTimeWindows, route: List[int], cost: int,
+            customer_ids: Optional[List[Hashable]] = None, save: bool = True):
+        """
+        Store route for tsp, keeping only the cheapest route per signature
+        """
+        if sorted(route) != list(range(1, tsp.n + 1)):
+            raise ValueError("Route must visit every customer exactly once")
+        ids = self._ids(tsp, customer_ids)
+        tokens = self._tokens(tsp, ids)
+        objective = self._objective(tsp)
+        signature = self._signature(objective, tokens)
+
+        entry = self.entries.get(signature)
+        if entry is None or cost < entry["cost"]:
+            entry = {
+                "signature": signature,
+                "tokens": tokens,
+                "route": [ids[customer - 1] for customer in route],
+                "cost": cost,
+                "objective": objective,
+                "uses": entry["uses"] if entry else 0,
+            }
+            self.entries[signature] = entry
+        entry["last_used"] = time.time()
+        self._evict()
+        if save:
+            self.save()
+
+    def repair(self, tsp: TSPTimeWindows, entry: dict, customer_ids: Optional[List[Hashable]] = None,
+               alns: Optional[ALNS] = None) -> Optional[List[int]]:
+        """
+        Map a stored route onto tsp: drop customers that are gone, repair the
+        order where windows changed, then insert new customers cheaply in
+        deadline order. Returns None if no feasible route comes out.
+        """
+        alns = alns or ALNS(tsp)
+        index = {customer: i + 1 for i, customer in enumerate(self._ids(tsp, customer_ids))}
+        kept = [index[customer] for customer in entry["route"] if customer in index]
+        repaired = alns.repair_route(kept) if kept else []
+        if repaired is None:
+            return None
+
+        placed = set(repaired)
+        new = sorted((c for c in range(1, tsp.n + 1) if c not in placed), key=lambda c: tsp.time_windows[c - 1][1])
+        route = alns.cheapest_insertion(repaired, new)
+        if route is None:
+            # Some new customer fits nowhere in the kept order, let repair_route rebuild around it
+            route = alns.repair_route(repaired + new)
+        return route
+
+    def warm_starts(self, tsp: TSPTimeWindows, customer_ids: Optional[List[Hashable]] = None,
+                    k: int = 3, min_similarity: float = 0.3) -> List[Tuple[List[int], int]]:
+        """
+        Repaired routes from the k most similar entries as (route, cost), best first
+        """
+        alns = ALNS(tsp)
+        candidates = []
+        for _, entry in self.similar(tsp, customer_ids, k, min_similarity):
+            route = self.repair(tsp, entry, customer_ids, alns)
+            if route is None:
+                continue
+            cost, feasible = tsp.fast_feasibility_check(route)
+            if feasible:
+                entry["uses"] += 1
+                entry["last_used"] = time.time()
+                candidates.append((route, cost))
+        candidates.sort(key=lambda candidate: candidate[1])
+        return candidates
+
+    def seed(self, tsp: TSPTimeWindows, customer_ids: Optional[List[Hashable]] = None,
+             k: int = 3, min_similarity: float = 0.3) -> Optional[List[int]]:
+        """
+        Put warm starts into tsp.warm_starts, so get_initial_solution (and
+        every solver built on it) considers them. Returns the best one, to use
+        as initial_route for local search or hint_route for CP-SAT.
+        """
+        candidates = self.warm_starts(tsp, customer_ids, k, min_similarity)
+        tsp.warm_starts = [route for route, _ in candidates]
+        return candidates[0][0] if candidates else None
+
+
+def solve_tsp_time_windows_pooled():
+    """Local search warm-started from a solution pool: solution_pool.py <pool.json> < input.txt"""
+    if len(sys.argv) < 2:
+        print("Usage: python solution_pool.py <pool.json> < input.txt")
+        sys.exit(1)
+
+    n, time_windows, travel_matrix = read_instance()
+    tsp = TSPTimeWindows(n, time_windows, travel_matrix)
+    pool = SolutionPool(sys.argv[1])
+    initial_route = pool.seed(tsp)
+    if initial_route is None:
+        print("Warning: no similar solution in the pool, starting from scratch", file=sys.stderr)
+
+    best_route, best_cost = tsp.local_search_optimized(initial_route=initial_route)
+    if tsp.fast_feasibility_check(best_route)[1]:
+        pool.add(tsp, best_route, best_cost)
+
+    print(n)
+    print(*best_route)
+    print(best_cost)
+
+if __name__ == "__main__":
+    solve_tsp_time_windows_pooled()
@@ -0,0 +1,411 @@
+import math
+import operator
+import os
+import sys
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional: validate_many falls back to pure Python
+    np = None
+
+INF = float('inf')
+
+
+class ValidationError(ValueError):
+    """Raised by self_check when a solver's reported result does not hold up"""
+
+
+class ValidationReport:
+    """
+    Result of checking one route against an instance
+
+    cost is the canonical cost used across the repo: total travel time
+    including the return leg to the depot. It is computed for any route
+    made of valid customer ids, feasible or not. violations lists
+    (position, customer, arrival, latest) for every late arrival.
+    """
+    __slots__ = ['length', 'missing', 'duplicates', 'unknown', 'violations',
+                 'travel', 'waiting', 'completion']
+
+    def __init__(self, length: int = 0, travel: int = 0, waiting: int = 0, completion: int = 0,
+                 missing: Sequence[int] = (), duplicates: Sequence[int] = (), unknown: Sequence = (),
+                 violations: Sequence[Tuple[int, int, int, int]] = ()):
+        self.length = length
+        self.travel = travel
+        self.waiting = waiting
+        self.completion = completion
+        self.missing = missing
+        self.duplicates = duplicates
+        self.unknown = unknown
+        self.violations = violations
+
+    @property
+    def complete(self) -> bool:
+        """Every customer is visited exactly once"""
+        return not (self.missing or self.duplicates or self.unknown)
+
+    @property
+    def feasible(self) -> bool:
+        return self.complete and not self.violations
+
+    @property
+    def cost(self) -> float:
+        return INF if self.unknown else self.travel
+
+    def summary(self, limit: int = 5) -> str:
+        if self.feasible:
+            return f"OK cost={self.cost}"
+        problems = []
+        if self.missing:
+            problems.append(f"missing {len(self.missing)} customers {self.missing[:limit]}")
+        if self.duplicates:
+            problems.append(f"{len(self.duplicates)} duplicate visits {self.duplicates[:limit]}")
+        if self.unknown:
+            problems.append(f"unknown customer ids {self.unknown[:limit]}")
+        if self.violations:
+            late = ", ".join(f"#{position} customer {customer} arrives {arrival} > {latest}"
+                             for position, customer, arrival, latest in self.violations[:limit])
+            problems.append(f"{len(self.violations)} window violations ({late})")
+        return f"INVALID cost={self.cost}: " + "; ".join(problems)
+
+
+def _unpack(instance) -> Tuple[int, Sequence[Tuple[int, int, int]], Sequence[Sequence[int]], int]:
+    """Accept a TSPTimeWindows or an (n, time_windows, travel_matrix) tuple"""
+    if hasattr(instance, "time_windows"):
+        return instance.n, instance.time_windows, instance.travel_matrix, instance.start_time
+    n, time_windows, travel_matrix = instance
+    return n, time_windows, travel_matrix, 0
+
+
+def validate(instance, route: Sequence[int]) -> ValidationReport:
+    """
+    Check route against instance: permutation completeness, time windows
+    (all violations, with their positions) and the recomputed cost
+    """
+    n, time_windows, travel_matrix, start_time = _unpack(instance)
+    unknown, duplicates = [], []
+    seen = [False] * (n + 1)
+    customers = []
+    for customer in route:
+        try:
+            customer = operator.index(customer)  # Accepts numpy integers too
+        except TypeError:
+            unknown.append(customer)
+            continue
+        if not 1 <= customer <= n:
+            unknown.append(customer)
+        elif seen[customer]:
+            duplicates.append(customer)
+        else:
+            seen[customer] = True
+        customers.append(customer)
+    missing = [customer for customer in range(1, n + 1) if not seen[customer]]
+    report = ValidationReport(len(route), missing=missing, duplicates=duplicates, unknown=unknown)
+    if unknown:
+        return report
+
+    current_time = start_time
+    location = 0
+    travel = waiting = 0
+    violations = []
+    for position, customer in enumerate(customers):
+        arrival = current_time + travel_matrix[location][customer]
+        travel += travel_matrix[location][customer]
+        earliest, latest, service_duration = time_windows[customer - 1]
+        if arrival > latest:
+            violations.append((position, customer, arrival, latest))
+        if arrival < earliest:
+            waiting += earliest - arrival
+            arrival = earliest
+        current_time = arrival + service_duration
+        location = customer
+
+    travel += travel_matrix[location][0]
+    report.violations = violations
+    report.travel = travel
+    report.waiting = waiting
+    report.completion = current_time + travel_matrix[location][0]
+    return report
+
+
+def validate_routes(instance, routes: Sequence[Sequence[int]]) -> ValidationReport:
+    """
+    validate() for a multi-vehicle solution: every route leaves the depot at
+    the start time, together they must visit every customer exactly once and
+    the cost is their summed travel (an empty route costs nothing).
+    Violation positions count through the routes in order.
+    """
+    if len(routes) == 1:
+        return validate(instance, routes[0])
+    report = validate(instance, [customer for route in routes for customer in route])
+    if report.unknown:
+        return report
+    report.travel = report.waiting = report.completion = 0
+    violations = []
+    offset = 0
+    for route in routes:
+        if route:
+            part = validate(instance, route)
+            report.travel += part.travel
+            report.waiting += part.waiting
+            report.completion = max(report.completion, part.completion)
+            violations.extend((offset + position, customer, arrival, latest)
+                              for position, customer, arrival, latest in part.violations)
+        offset += len(route)
+    report.violations = violations
+    return report
+
+
+def validate_many(instance, routes: Iterable[Sequence[int]], chunk_elements: int = 1 << 22) -> List[ValidationReport]:
+    """
+    validate() for many routes of the same instance
+
+    With numpy, complete routes are simulated position by position across
+    a chunk of about chunk_elements route entries at once (a few arrays of
+    that many int64 values); routes that are not permutations, and
+    everything when numpy is missing, go through validate().
+    """
+    routes = list(routes)
+    n = _unpack(instance)[0]
+    if np is None or n == 0:
+        return [validate(instance, route) for route in routes]
+
+    reports: List[Optional[ValidationReport]] = [None] * len(routes)
+    candidates = [i for i, route in enumerate(routes) if len(route) == n]
+    for i in range(len(routes)):
+        if len(routes[i]) != n:
+            reports[i] = validate(instance, routes[i])
+
+    chunk_size = max(1, chunk_elements // n)
+    for chunk_start in range(0, len(candidates), chunk_size):
+        chunk = candidates[chunk_start:chunk_start + chunk_size]
+        for i, report in zip(chunk, _validate_chunk(instance, [routes[i] for i in chunk])):
+            reports[i] = report if report is not None else validate(instance, routes[i])
+    return reports
+
+
+def _validate_chunk(instance, routes: List[Sequence[int]]) -> List[Optional[ValidationReport]]:
+    """Vectorized validation of equal-length routes; None where a route is not a permutation"""
+    n, time_windows, travel_matrix, start_time = _unpack(instance)
+    try:
+        matrix = np.asarray(routes)
+    except (TypeError, ValueError):
+        return [None] * len(routes)
+    # Only genuine integers: casting would truncate 1.5 or parse "3", which validate() rejects
+    if matrix.ndim != 2 or matrix.shape[1] != n or matrix.dtype.kind not in "iu":
+        return [None] * len(routes)
+    matrix = matrix.astype(np.int64)
+    permutation = (np.sort(matrix, axis=1) == np.arange(1, n + 1)).all(axis=1)
+
+    size = n + 1
+    flat_travel = np.asarray(travel_matrix, dtype=np.int64).ravel()  # travel i -> j at i * size + j
+    windows = np.asarray([(0, 0, 0)] + list(time_windows), dtype=np.int64)
+    earliest, latest, service = windows[:, 0], windows[:, 1], windows[:, 2]
+    # Rows that are not permutations are simulated on a dummy route and discarded
+    matrix = np.where(permutation[:, None], matrix, np.arange(1, n + 1))
+
+    count = len(routes)
+    current_time = np.full(count, start_time, dtype=np.int64)
+    location = np.zeros(count, dtype=np.int64)
+    travel = np.zeros(count, dtype=np.int64)
+    waiting = np.zeros(count, dtype=np.int64)
+    late_rows, late_positions, late_arrivals = [], [], []
+    for position in range(n):
+        customer = matrix[:, position]
+        leg = flat_travel[location * size + customer]
+        arrival = current_time + leg
+        travel += leg
+        late = np.flatnonzero(arrival > latest[customer])
+        if late.size:
+            late_rows.append(late)
+            late_positions.append(np.full(late.size, position))
+            late_arrivals.append(arrival[late])
+        start = np.maximum(arrival, earliest[customer])
+        waiting += start - arrival
+        current_time = start + service[customer]
+        location = customer
+    leg = flat_travel[location * size]
+    travel += leg
+    completion = current_time + leg
+
+    reports: List[Optional[ValidationReport]] = [
+        ValidationReport(n, *values) if is_permutation else None
+        for is_permutation, *values in zip(permutation.tolist(), travel.tolist(), waiting.tolist(), completion.tolist())
+    ]
+
+    if late_rows:
+        rows = np.concatenate(late_rows)
+        positions = np.concatenate(late_positions)
+        arrivals = np.concatenate(late_arrivals)
+        order = np.argsort(rows, kind="stable")  # Keeps positions ascending within a route
+        for row, position, arrival in zip(rows[order].tolist(), positions[order].tolist(), arrivals[order].tolist()):
+            report = reports[row]
+            if report is not None:
+                if not report.violations:
+                    report.violations = []
+                customer = int(matrix[row, position])
+                report.violations.append((position, customer, arrival, int(latest[customer])))
+    return reports
+
+
+def debug_enabled() -> bool:
+    """Solvers self-check their results when TSPTW_DEBUG is set (and not 0)"""
+    return os.environ.get("TSPTW_DEBUG", "") not in ("", "0")
+
+
+def self_check(instance, route: Sequence[int], cost: Optional[float] = None, source: str = "solver",
+               complete: bool = True) -> Optional[ValidationReport]:
+    """
+    In debug mode, check what a solver reports against the validator:
+    the route must be complete (unless complete is False, for one route
+    of a multi-vehicle solution) and a finite cost must belong to a
+    feasible route and match the recomputed objective value. Raises
+    ValidationError on mismatch; does nothing outside debug mode.
+    """
+    if not debug_enabled():
+        return None
+    report = validate(instance, route)
+    problems = []
+    if report.unknown or (complete and not report.complete):
+        problems.append(report.summary())
+    if cost is not None and cost != INF:
+        if report.violations:
+            problems.append(f"reported cost {cost} for an infeasible route: {report.summary()}")
+        else:
+            expected = report.travel
+            if hasattr(instance, "objective_value"):
+                expected = instance.objective_value(report.travel, report.waiting, report.completion)
+            if abs(cost - expected) > 1e-6 * max(1, abs(expected)):
+                problems.append(f"reported cost {cost}, recomputed {expected}")
+    if problems:
+        raise ValidationError(f"{source}: " + "; ".join(problems))
+    return report
+
+
+def _integers(tokens: List[str]) -> Optional[List[int]]:
+    try:
+        return [int(token) for token in tokens]
+    except ValueError:
+        return None
+
+
+def _number(token: str) -> Optional[float]:
+    """Finite int or float value of token, None otherwise (e.g. "inf")"""
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _read_output(lines: List[List[str]], header: int, n: int,
+                 complete: bool) -> Optional[Tuple[List[List[int]], Optional[float]]]:
+    """
+    Routes after the header line, up to n customers (a single route line
+    unless complete), and the cost printed after the routes or else on the
+    line before the header. None if complete and they do not add up to n.
+    """
+    routes, count = [], 0
+    position = header + 1
+    while position < len(lines) and count < n:
+        customers = _integers(lines[position])
+        position += 1
+        if customers is not None:
+            routes.append(customers)
+            count += len(customers)
+            if not complete:
+                break
+    if complete and count != n:
+        return None
+    cost = None
+    if position < len(lines) and len(lines[position]) == 1:
+        cost = _number(lines[position][0])
+    if cost is None and header > 0:
+        cost = _number(lines[header - 1][-1])
+    return routes, cost
+
+
+def read_solution(stream, n: Optional[int] = None) -> List[Tuple[List[List[int]], Optional[float]]]:
+    """
+    Read a solver output or a solution file as (routes, reported_cost) pairs
+
+    Given n, solver output is recognised in the formats the entry points
+    print: a header line holding n, then the route (or one line per vehicle,
+    as vrptw.py prints) and the cost either after the routes or on the line
+    before the header (backtrack.py, LS_AI.py, "Optimal solution X" from
+    cp_next_var.py). Other lines, like the feasibility flag of LS_AI.py, are
+    skipped. Without a header, every line is one route. Raises ValueError
+    if such a line is not a route.
+    """
+    lines = [line.split() for line in stream if line.strip()]
+    if n is not None:
+        headers = [i for i, tokens in enumerate(lines) if len(tokens) == 1 and _number(tokens[0]) == n]
+        # A cost equal to n can look like a header too: prefer the header whose routes add up to n
+        for complete in (True, False):
+            for header in headers:
+                solution = _read_output(lines, header, n, complete)
+                if solution is not None and solution[0]:
+                    return [solution]
+    solutions = []
+    for number, tokens in enumerate(lines, start=1):
+        customers = _integers(tokens)
+        if customers is None:
+            raise ValueError(f"line {number} is not a route: {' '.join(tokens)[:40]}")
+        solutions.append(([customers], None))
+    return solutions
+
+
+def validate_files():
+    """Check solution files against an instance: validator.py <instance> <solution>..."""
+    if len(sys.argv) < 3:
+        print("Usage: python validator.py <instance> <solution> [<solution> ...]")
+        sys.exit(1)
+
+    from local_search import read_instance
+    with open(sys.argv[1]) as f:
+        instance = read_instance(f)
+    n = instance[0]
+
+    total = invalid = 0
+    for path in sys.argv[2:]:
+        try:
+            with open(path) as f:
+                solutions = read_solution(f, n)
+        except (OSError, ValueError) as error:
+            total += 1
+            invalid += 1
+            print(f"{path}: cannot read solution: {error}")
+            continue
+        if not solutions:
+            total += 1
+            invalid += 1
+            print(f"{path}: no solution found")
+            continue
+        single = [routes[0] for routes, _ in solutions if len(routes) == 1]
+        if len(single) == len(solutions):
+            reports = validate_many(instance, single)
+        else:
+            reports = [validate_routes(instance, routes) for routes, _ in solutions]
+        for index, (report, (_, cost)) in enumerate(zip(reports, solutions)):
+            total += 1
+            message = report.summary()
+            ok = report.feasible
+            if cost is not None and cost != report.cost:
+                message += f" (reported cost {cost})"
+                ok = False
+            if not ok:
+                invalid += 1
+            if not ok or len(solutions) == 1:
+                label = path if len(solutions) == 1 else f"{path}:{index + 1}"
+                print(f"{label}: {message}")
+
+    print(f"{total - invalid}/{total} routes valid", file=sys.stderr)
+    sys.exit(1 if invalid else 0)
+
+if __name__ == "__main__":
+    validate_files()
@@ -0,0 +1,337 @@
+import heapq
+import random
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+from alns import ALNS
+from local_search import TSPTimeWindows, read_instance
+from validator import self_check
+
+
+class MultiRouteTSPTW:
+    """
+    Multi-vehicle (VRPTW) mode sharing the TSPTimeWindows evaluation kernel
+
+    Every vehicle leaves the depot at tsp.start_time and the solution cost
+    is the sum of the per-route objective values; an unused vehicle costs
+    nothing (unlike TSPTimeWindows, where an empty route still completes at
+    start_time). Each route caches its
+    RouteState and latest-start (slack) schedule, so a move only rechecks
+    the routes it touches, usually in O(1) before simulating their tails.
+    Capacity is counted in demand units (one per customer by default).
+    """
+    def __init__(self, tsp: TSPTimeWindows, vehicles: int, capacity: Optional[int] = None,
+                 demands: Optional[List[int]] = None, neighbours: int = 20, seed: Optional[int] = None):
+        self.tsp = tsp
+        self.vehicles = vehicles
+        self.capacity = capacity
+        self.demands = demands if demands is not None else [0] + [1] * tsp.n  # demands[0] is the depot
+        self.random = random.Random(seed)
+        self.alns = ALNS(tsp, seed=seed)
+
+        # Granular neighbourhood: only try moves towards the closest customers
+        t = tsp.travel_matrix
+        self.neighbours = [[]] + [
+            heapq.nsmallest(neighbours, (j for j in range(1, tsp.n + 1) if j != i), key=lambda j: t[i][j] + t[j][i])
+            for i in range(1, tsp.n + 1)
+        ]
+
+        self.routes: List[List[int]] = [[] for _ in range(vehicles)]
+        self.unassigned: List[int] = []
+        self.costs = [0] * vehicles
+        self.loads = [0] * vehicles
+        self.states = [None] * vehicles
+        self.latest = [None] * vehicles
+        self.where = [(-1, -1)] * (tsp.n + 1)  # customer -> (route, position)
+        for r in range(vehicles):
+            self._refresh(r)
+
+    # ------------------------------------------------------------------
+    # Per-route state
+    # ------------------------------------------------------------------
+
+    def _route_cost(self, route: List[int]) -> Tuple[int, bool]:
+        if not route:
+            return 0, True
+        return self.tsp.fast_feasibility_check(route)
+
+    def _tail_cost(self, r: int, keep: int, tail: List[int]) -> Tuple[int, bool]:
+        if keep == 0 and not tail:
+            return 0, True
+        return self.tsp.evaluate_tail(self.states[r], keep, tail)
+
+    def _refresh(self, r: int):
+        """Recompute the cached state of route r after it changed"""
+        route = self.routes[r]
+        self.costs[r], _ = self._route_cost(route)
+        self.loads[r] = sum(self.demands[c] for c in route)
+        self.states[r] = self.tsp.route_state(route)
+        _, self.latest[r] = self.alns._schedule(route)
+        for position, customer in enumerate(route):
+            self.where[customer] = (r, position)
+
+    def _fits(self, r: int, keep: int, customer: int, resume: int) -> bool:
+        """
+        O(1) check that routes[r][:keep] + [customer] + routes[r][resume:]
+        keeps every window, from the cached departure/latest-start schedule
+        """
+        route = self.routes[r]
+        earliest, latest_start, service_duration = self.tsp.time_windows[customer - 1]
+        previous = route[keep - 1] if keep > 0 else 0
+        arrival = self.states[r].departure[keep] + self.tsp.travel_matrix[previous][customer]
+        if arrival > latest_start:
+            return False
+        if resume >= len(route):
+            return True
+        leave = max(arrival, earliest) + service_duration
+        return leave + self.tsp.travel_matrix[customer][route[resume]] <= self.latest[r][resume + 1]
+
+    def _load_ok(self, r: int, load: int) -> bool:
+        return self.capacity is None or load <= self.capacity
+
+    def total_cost(self) -> int:
+        return sum(self.costs)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def construct(self):
+        """
+        Parallel cheapest insertion in deadline order across all vehicles
+        """
+        self.routes = [[] for _ in range(self.vehicles)]
+        self.unassigned = []
+        self.where = [(-1, -1)] * (self.tsp.n + 1)
+        for r in range(self.vehicles):
+            self._refresh(r)
+
+        self.insert_customers(self.tsp.customer_by_deadline)
+
+    def insert_customers(self, customers: List[int]) -> int:
+        """
+        Insert each customer at its cheapest feasible position in any vehicle
+        Customers that fit nowhere are appended to self.unassigned.
+        Returns the number of customers inserted.
+        """
+        inserted = 0
+        for customer in customers:
+            best = None
+            tried_empty = False
+            for r in range(self.vehicles):
+                if not self.routes[r]:
+                    # All empty vehicles are identical
+                    if tried_empty:
+                        continue
+                    tried_empty = True
+                if not self._load_ok(r, self.loads[r] + self.demands[customer]):
+                    continue
+                options = self.alns._best_insertions(self.routes[r], customer, self.states[r].departure,
+                                                     self.latest[r], 1)
+                if options:
+                    delta, position = options[0]
+                    if best is None or delta < best[0]:
+                        best = (delta, r, position)
+
+            if best is None:
+                self.unassigned.append(customer)
+                continue
+            _, r, position = best
+            self.routes[r].insert(position, customer)
+            self._refresh(r)
+            inserted += 1
+        return inserted
+
+    # ------------------------------------------------------------------
+    # Inter-route moves (first improvement)
+    # ------------------------------------------------------------------
+
+    def _apply(self, changes: List[Tuple[int, List[int]]]):
+        for r, route in changes:
+            self.routes[r] = route
+            self._refresh(r)
+
+    def _candidate_positions(self, customer: int):
+        """(route, position) pairs next to the customer's neighbours, plus one empty vehicle"""
+        seen = set()
+        for neighbour in self.neighbours[customer]:
+            r, position = self.where[neighbour]
+            if r < 0:
+                continue
+            for candidate in ((r, position), (r, position + 1)):
+                if candidate not in seen:
+                    seen.add(candidate)
+                    yield candidate
+        for r in range(self.vehicles):
+            if not self.routes[r]:
+                yield r, 0
+                break
+
+    def try_relocate(self, customer: int) -> bool:
+        """Move customer into another route next to one of its neighbours"""
+        a, i = self.where[customer]
+        route_a = self.routes[a]
+        demand = self.demands[customer]
+        removal_cost = None
+
+        for b, j in self._candidate_positions(customer):
+            if b == a or not self._load_ok(b, self.loads[b] + demand):
+                continue
+            if not self._fits(b, j, customer, j):
+                continue
+            if removal_cost is None:
+                removal_cost, feasible = self._tail_cost(a, i, route_a[i + 1:])
+                if not feasible:
+                    return False
+            new_b, feasible = self._tail_cost(b, j, [customer] + self.routes[b][j:])
+            if feasible and removal_cost + new_b < self.costs[a] + self.costs[b]:
+                route_b = self.routes[b]
+                self._apply([(a, route_a[:i] + route_a[i + 1:]), (b, route_b[:j] + [customer] + route_b[j:])])
+                return True
+        return False
+
+    def try_exchange(self, customer: int) -> bool:
+        """Swap customer with a neighbour served by another route"""
+        a, i = self.where[customer]
+        for other in self.neighbours[customer]:
+            b, j = self.where[other]
+            if b < 0 or b == a:
+                continue
+            load_a = self.loads[a] - self.demands[customer] + self.demands[other]
+            load_b = self.loads[b] - self.demands[other] + self.demands[customer]
+            if not (self._load_ok(a, load_a) and self._load_ok(b, load_b)):
+                continue
+            if not (self._fits(b, j, customer, j + 1) and self._fits(a, i, other, i + 1)):
+                continue
+            route_a, route_b = self.routes[a], self.routes[b]
+            new_a, feasible_a = self._tail_cost(a, i, [other] + route_a[i + 1:])
+            if not feasible_a:
+                continue
+            new_b, feasible_b = self._tail_cost(b, j, [customer] + route_b[j + 1:])
+            if feasible_b and new_a + new_b < self.costs[a] + self.costs[b]:
+                self._apply([(a, route_a[:i] + [other] + route_a[i + 1:]),
+                             (b, route_b[:j] + [customer] + route_b[j + 1:])])
+                return True
+        return False
+
+    def try_two_opt_star(self, customer: int) -> bool:
+        """Exchange route tails so that customer is followed by a neighbour"""
+        a, i = self.where[customer]
+        for other in self.neighbours[customer]:
+            b, j = self.where[other]
+            if b < 0 or b == a:
+                continue
+            route_a, route_b = self.routes[a], self.routes[b]
+            tail_a, tail_b = route_a[i + 1:], route_b[j:]
+            load_tail_a = sum(self.demands[c] for c in tail_a)
+            load_tail_b = sum(self.demands[c] for c in tail_b)
+            if not (self._load_ok(a, self.loads[a] - load_tail_a + load_tail_b)
+                    and self._load_ok(b, self.loads[b] - load_tail_b + load_tail_a)):
+                continue
+            # Cheap reject: customer -> other must fit in b's schedule
+            departure_a = self.states[a].departure[i + 1]
+            if departure_a + self.tsp.travel_matrix[customer][other] > self.latest[b][j + 1]:
+                continue
+            new_a, feasible_a = self._tail_cost(a, i + 1, tail_b)
+            if not feasible_a:
+                continue
+            new_b, feasible_b = self._tail_cost(b, j, tail_a)
+            if feasible_b and new_a + new_b < self.costs[a] + self.costs[b]:
+                self._apply([(a, route_a[:i + 1] + tail_b), (b, route_b[:j] + tail_a)])
+                return True
+        return False
+
+    def improve_route(self, r: int):
+        """Intra-route improvement with the single-route operators"""
+        if len(self.routes[r]) < 3:
+            return
+        route, cost = self.tsp.fast_relocate(self.routes[r], max_attempts=50)
+        route, cost = self.tsp.fast_2opt(route, max_attempts=50)
+        if cost < self.costs[r]:
+            self._apply([(r, route)])
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+
+    def solve(self, time_limit: float = 30.0,
+              on_improvement: Optional[Callable[[List[List[int]], int], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[List[int]], int]:
+        """
+        Construct and improve a multi-route solution
+        Returns (routes, total_cost); customers that fit in no vehicle are
+        left in self.unassigned
+        """
+        start_time = time.time()
+        self.construct()
+        if self.unassigned:
+            print(f"Warning: {len(self.unassigned)} customers could not be assigned to a vehicle", file=sys.stderr)
+
+        best_cost = self.total_cost()
+        if on_improvement:
+            on_improvement([route[:] for route in self.routes], best_cost)
+
+        customers = [c for c in range(1, self.tsp.n + 1) if self.where[c][0] >= 0]
+        improved = True
+        while improved and time.time() - start_time < time_limit:
+            if should_stop and should_stop():
+                break
+            improved = False
+            self.random.shuffle(customers)
+            before = [route[:] for route in self.routes]
+
+            for customer in customers:
+                if time.time() - start_time >= time_limit:
+                    break
+                if self.try_relocate(customer) or self.try_exchange(customer) or self.try_two_opt_star(customer):
+                    improved = True
+
+            # Intra-route polish only where routes changed
+            for r in range(self.vehicles):
+                if self.routes[r] != before[r] or not improved:
+                    self.improve_route(r)
+
+            if self.unassigned:
+                # Local search may have freed room for customers left out so far
+                pending, self.unassigned = self.unassigned, []
+                if self.insert_customers(pending):
+                    customers = [c for c in range(1, self.tsp.n + 1) if self.where[c][0] >= 0]
+                    best_cost = float('inf')
+                    improved = True
+
+            cost = self.total_cost()
+            if cost < best_cost:
+                best_cost = cost
+                improved = True
+                if on_improvement:
+                    on_improvement([route[:] for route in self.routes], best_cost)
+
+        for r, route in enumerate(self.routes):
+            if route:  # Unused vehicles cost 0 by definition, see the class docstring
+                self_check(self.tsp, route, self.costs[r], f"VRPTW vehicle {r}", complete=False)
+        # Every customer is served by exactly one vehicle or left unassigned
+        self_check(self.tsp, [c for route in self.routes for c in route] + self.unassigned, source="VRPTW")
+        return [route[:] for route in self.routes], self.total_cost()
+
+
+def solve_vrptw():
+    """Main function to solve the multi-vehicle variant: vrptw.py <vehicles> [capacity]"""
+    if len(sys.argv) < 2:
+        print("Usage: python vrptw.py <vehicles> [capacity] < input.txt")
+        sys.exit(1)
+    vehicles = int(sys.argv[1])
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    n, time_windows, travel_matrix = read_instance()
+    tsp = TSPTimeWindows(n, time_windows, travel_matrix)
+    solver = MultiRouteTSPTW(tsp, vehicles, capacity)
+    routes, cost = solver.solve()
+
+    print(n)
+    for route in routes:
+        print(*route)
+    print(cost)
+
+if __name__ == "__main__":
+    solve_vrptw()